@@ -3,22 +3,27 @@ Data filtering functions for processing of battery data.
 """
 
 import pandas as pd
+from functools import lru_cache
 from .parsing import is_6000
 
+# Report columns read by the section filters below (and the PowerMode counts built on them),
+# so callers that only need the sections can read just these columns
+SECTION_FILTER_COLUMNS = ['DeviceID', 'DeviceName', 'CustomerName', 'EventTimeUTC', 'PowerMode']
+
 def get_LOW_latest_batt(latest_batt, active_device_ids=None):
     """
     Filter DataFrame to get devices with low battery power modes.
     
     Args:
         latest_batt (pandas.DataFrame): Battery data DataFrame
-        active_device_ids (set or list, optional): Set or list of active device IDs to filter by
+        active_device_ids (set, list or pandas.Index, optional): Active device IDs to filter by
         
     Returns:
         pandas.DataFrame: Filtered DataFrame with low battery devices
     """
     df = latest_batt
     new_pv_devices = get_new_pv_panel_devices(latest_batt, active_device_ids)
-    IDs_newPV = list(new_pv_devices['DeviceID'])
+    IDs_newPV = new_pv_devices['DeviceID'].to_numpy()
     
     # Define power mode conditions
     cond_powerMode = (df['PowerMode'].isin(['Critical', 'Low', 'Medium']))
@@ -30,6 +35,21 @@ def get_LOW_latest_batt(latest_batt, active_device_ids=None):
     return latest_batt_LOW
 
 
+@lru_cache(maxsize=1)
+def _load_mila_ids(path_newPV_mila="ZIM-New Panel (Mila).csv"):
+    """
+    Load the new panel device IDs from Mila's CSV, once per process.
+    
+    Args:
+        path_newPV_mila (str): Path to Mila's CSV
+        
+    Returns:
+        frozenset: DeviceIDs from Mila's list
+    """
+    newPV_mila = pd.read_csv(path_newPV_mila, usecols=['DeviceID'])
+    return frozenset(newPV_mila['DeviceID'])
+
+
 def get_new_pv_panel_devices(latest_batt, active_device_ids=None):
     """
     Filter DataFrame for Section 1: New PV Panel devices.
@@ -38,29 +58,29 @@ def get_new_pv_panel_devices(latest_batt, active_device_ids=None):
     
     Args:
         latest_batt (pandas.DataFrame): Battery data DataFrame
-        active_device_ids (set or list, optional): Set or list of active device IDs to filter by
+        active_device_ids (set, list or pandas.Index, optional): Active device IDs to filter by
         
     Returns:
         pandas.DataFrame: Filtered DataFrame with New PV Panel devices
     """
     df = latest_batt
-    df = df.dropna(subset=['DeviceID', 'DeviceName'])
-    
-    # Import list of new panel IDs from Mila's CSV
-    csv_filename = "ZIM-New Panel (Mila).csv"
-    path_newPV_mila = csv_filename
-    newPV_mila = pd.read_csv(path_newPV_mila)
-    IDs_newPV_mila = list(newPV_mila['DeviceID'])
     
-    # Define filtering conditions
-    cond_mila_list = df['DeviceID'].isin(IDs_newPV_mila)
-    cond_a0_6000 = (df['DeviceID'].str.startswith('A0')) & (df['DeviceID'].apply(is_6000))
+    # Apply the most selective predicate (customer) first so later conditions only scan its rows
     cond_zim = df['CustomerName'].str.lower() == 'zim'
+    df = df[cond_zim].dropna(subset=['DeviceID', 'DeviceName'])
+    
+    # Keep only paired devices seen recently
     cond_paired = df['DeviceID'] != df['DeviceName']
     cond_lastSeen = abs(pd.Timestamp.today() - df['EventTimeUTC']) <= pd.Timedelta(weeks=12)
+    df = df[cond_paired & cond_lastSeen]
+    
+    # Import list of new panel IDs from Mila's CSV (read once, then reused for every report)
+    IDs_newPV_mila = _load_mila_ids()
     
-    # Apply filters: (Mila list OR ZIM A0 6000+) AND paired AND seen recently
-    df_filtered = df[(cond_mila_list | cond_a0_6000) & cond_zim & cond_paired & cond_lastSeen]
+    # Apply filters: Mila list OR ZIM A0 6000+ (the per-row is_6000 check runs on the reduced frame)
+    cond_mila_list = df['DeviceID'].isin(IDs_newPV_mila)
+    cond_a0_6000 = (df['DeviceID'].str.startswith('A0')) & (df['DeviceID'].apply(is_6000))
+    df_filtered = df[cond_mila_list | cond_a0_6000]
     
     # Filter by active devices if provided
     if active_device_ids is not None:
@@ -76,22 +96,24 @@ def get_zim_c_devices(latest_batt, active_device_ids=None):
     
     Args:
         latest_batt (pandas.DataFrame): Battery data DataFrame
-        active_device_ids (set or list, optional): Set or list of active device IDs to filter by
+        active_device_ids (set, list or pandas.Index, optional): Active device IDs to filter by
         
     Returns:
         pandas.DataFrame: Filtered DataFrame with ZIM C devices
     """
     df = latest_batt
-    df = df.dropna(subset=['DeviceID', 'DeviceName'])
     
-    # Define filtering conditions
+    # Apply the most selective predicate (customer) first so later conditions only scan its rows
     cond_zim = df['CustomerName'].str.lower() == 'zim'
+    df = df[cond_zim].dropna(subset=['DeviceID', 'DeviceName'])
+    
+    # Define filtering conditions
     cond_c_devices = df['DeviceID'].str.startswith('C')
     cond_paired = df['DeviceID'] != df['DeviceName']
     cond_lastSeen = abs(pd.Timestamp.today() - df['EventTimeUTC']) <= pd.Timedelta(weeks=12)
     
-    # Apply filters: ZIM AND C devices AND paired AND seen recently
-    df_filtered = df[cond_zim & cond_c_devices & cond_paired & cond_lastSeen]
+    # Apply filters: C devices AND paired AND seen recently
+    df_filtered = df[cond_c_devices & cond_paired & cond_lastSeen]
     
     # Filter by active devices if provided
     if active_device_ids is not None:
@@ -107,21 +129,23 @@ def get_samskip_devices(latest_batt, active_device_ids=None):
     
     Args:
         latest_batt (pandas.DataFrame): Battery data DataFrame
-        active_device_ids (set or list, optional): Set or list of active device IDs to filter by
+        active_device_ids (set, list or pandas.Index, optional): Active device IDs to filter by
         
     Returns:
         pandas.DataFrame: Filtered DataFrame with samskip devices
     """
     df = latest_batt
-    df = df.dropna(subset=['DeviceID', 'DeviceName'])
     
-    # Define filtering conditions
+    # Apply the most selective predicate (customer) first so later conditions only scan its rows
     cond_samskip = df['CustomerName'].str.lower() == 'samskip'
+    df = df[cond_samskip].dropna(subset=['DeviceID', 'DeviceName'])
+    
+    # Define filtering conditions
     cond_paired = df['DeviceID'] != df['DeviceName']
     cond_lastSeen = abs(pd.Timestamp.today() - df['EventTimeUTC']) <= pd.Timedelta(weeks=12)
     
-    # Apply filters: samskip AND paired AND seen recently
-    df_filtered = df[cond_samskip & cond_paired & cond_lastSeen]
+    # Apply filters: paired AND seen recently
+    df_filtered = df[cond_paired & cond_lastSeen]
     
     # Filter by active devices if provided
     if active_device_ids is not None:
@@ -137,21 +161,23 @@ def get_hmm_devices(latest_batt, active_device_ids=None):
     
     Args:
         latest_batt (pandas.DataFrame): Battery data DataFrame
-        active_device_ids (set or list, optional): Set or list of active device IDs to filter by
+        active_device_ids (set, list or pandas.Index, optional): Active device IDs to filter by
         
     Returns:
         pandas.DataFrame: Filtered DataFrame with HMM devices
     """
     df = latest_batt
-    df = df.dropna(subset=['DeviceID', 'DeviceName'])
     
-    # Define filtering conditions
+    # Apply the most selective predicate (customer) first so later conditions only scan its rows
     cond_hmm = df['CustomerName'].str.lower() == 'hmm'
+    df = df[cond_hmm].dropna(subset=['DeviceID', 'DeviceName'])
+    
+    # Define filtering conditions
     cond_paired = df['DeviceID'] != df['DeviceName']
     cond_lastSeen = abs(pd.Timestamp.today() - df['EventTimeUTC']) <= pd.Timedelta(weeks=12)
     
-    # Apply filters: HMM AND paired AND seen recently
-    df_filtered = df[cond_hmm & cond_paired & cond_lastSeen]
+    # Apply filters: paired AND seen recently
+    df_filtered = df[cond_paired & cond_lastSeen]
     
     # Filter by active devices if provided
     if active_device_ids is not None:
@@ -2,47 +2,188 @@
 File Input/Output operations for battery data with metadata support.
 """
 
-import pandas as pd
 import os
+import json
+import logging
+import hashlib
 from datetime import datetime
+from functools import lru_cache
+from utils import format_date_for_filename
 
-def save_df_with_metadata(df, query_time, path_csv):
+log = logging.getLogger(__name__)
+
+# Where daily reports (and their sidecars) and the chart images are stored
+REPORTS_DIR = "latest_batt_reports"
+CHARTS_DIR = os.path.join(REPORTS_DIR, "charts")
+
+# pandas and pyarrow are imported inside the read/save functions so that get_report_filename
+# can be used (e.g. for existence checks) without loading them
+
+def ensure_dirs():
+    """
+    Create the reports and charts directories if they do not exist yet.
+    
+    Called once by the command line entry points, so the code that writes reports and
+    charts does not have to check on every call.
+    """
+    os.makedirs(CHARTS_DIR, exist_ok=True)
+
+def save_df_with_metadata(df, query_time, path_report):
     """
-    Save DataFrame to CSV file with metadata header.
+    Save DataFrame with its query time metadata.
+    
+    Reports ending in '.parquet' are written as zstd-compressed Parquet with the query time
+    stored in the file's schema metadata; any other path is written as CSV with a metadata header.
     
     Args:
         df (pandas.DataFrame): Data to save
         query_time (float): Query execution time in seconds
-        path_csv (str): Path to save the CSV file
+        path_report (str): Path to save the report file
     """
-    with open(path_csv, 'w') as f:
+    if path_report.endswith('.parquet'):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), b'query_time': str(query_time).encode()})
+        pq.write_table(table, path_report, compression='zstd')
+        return
+    
+    with open(path_report, 'w') as f:
         f.write('### METADATA ###\n')
         f.write(f'query_time,{query_time}\n')
         f.write('### DATA ###\n')
         df.to_csv(f, index=False)
 
-def read_df_with_metadata(path_csv):
+def read_df_with_metadata(path_report, usecols=None, dtype=None):
     """
-    Read DataFrame from CSV file with metadata header.
+    Read DataFrame and its query time from a Parquet report or a CSV file with metadata header.
     
     Args:
-        path_csv (str): Path to the CSV file
+        path_report (str): Path to the report file ('.parquet' or '.csv')
+        usecols (list, optional): Only load these columns (all columns if None)
+        dtype (dict, optional): Column dtypes to use (e.g. {'PowerMode': 'category'})
         
     Returns:
         tuple: (DataFrame, query_time_seconds)
     """
-    with open(path_csv, 'r') as f:
-        f.readline()  # Skip separator
-        query_time = float(f.readline().split(',')[1])
-        f.readline()  # Skip separator
-        df = pd.read_csv(f)
+    import pandas as pd
     
-    df['EventTimeUTC'] = pd.to_datetime(df['EventTimeUTC'])
+    if path_report.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        
+        # Parquet is columnar, so only the requested columns are read from disk; memory-mapping
+        # reads them straight from the OS page cache when the report was read recently
+        table = pq.read_table(path_report, columns=usecols, memory_map=True)
+        query_time = float(table.schema.metadata[b'query_time'])
+        df = table.to_pandas()
+        if dtype is not None:
+            df = df.astype(dtype)
+    else:
+        with open(path_report, 'r') as f:
+            f.readline()  # Skip separator
+            query_time = float(f.readline().split(',')[1])
+            f.readline()  # Skip separator
+            df = pd.read_csv(f, usecols=usecols, dtype=dtype, engine='c', low_memory=False)
+    
+    if 'EventTimeUTC' in df.columns:
+        df['EventTimeUTC'] = pd.to_datetime(df['EventTimeUTC'])
     return df, query_time
 
+def convert_legacy_report(path_report):
+    """
+    Convert the legacy CSV version of a Parquet report, if there is one.
+    
+    Reports used to be saved as CSV; this keeps existing reports usable (instead of
+    regenerating them) while the reports directory moves over to Parquet.
+    
+    Args:
+        path_report (str): Path of the Parquet report (e.g. from get_report_filename)
+        
+    Returns:
+        bool: True if a legacy CSV was found and converted, False otherwise (including when the
+              CSV could not be read, so the caller treats the report as missing)
+    """
+    path_legacy = path_report[:-len('.parquet')] + '.csv'
+    if not os.path.exists(path_legacy):
+        return False
+    
+    try:
+        df, query_time = read_df_with_metadata(path_legacy)
+        save_df_with_metadata(df, query_time, path_report)
+    except Exception as e:
+        log.warning(f"⚠️ Warning: Could not convert legacy report {path_legacy}: {e}")
+        return False
+    log.info(f"🔄 Converted legacy report {path_legacy} to {path_report}")
+    return True
+
+def get_counts_filename(path_report):
+    """
+    Path of the power mode counts sidecar stored next to a report.
+    
+    Args:
+        path_report (str): Path of the report file
+        
+    Returns:
+        str: Path of the '.counts.json' sidecar (e.g. 'latest_batt_5Jan26_smbs.counts.json')
+    """
+    return os.path.splitext(path_report)[0] + '.counts.json'
+
+def get_active_devices_key(active_device_ids):
+    """
+    Fingerprint of an active device list, so counts filtered with it can be matched to a later run.
+    
+    Args:
+        active_device_ids (set, list or pandas.Index, optional): Active device IDs the sections were filtered by
+        
+    Returns:
+        str: Hash of the sorted device IDs, or None if no active filtering was applied
+    """
+    if active_device_ids is None:
+        return None
+    ids = sorted(str(device_id) for device_id in active_device_ids)
+    return hashlib.sha256('\n'.join(ids).encode()).hexdigest()
+
+def save_power_mode_counts(path_report, section_counts, active_devices_key, reference_date):
+    """
+    Save the per-section power mode counts of a report to its JSON sidecar.
+    
+    Args:
+        path_report (str): Path of the report the counts were computed from
+        section_counts (dict): Section name -> {PowerMode: count}
+        active_devices_key (str): get_active_devices_key of the active devices the sections were filtered by
+        reference_date (str): Day the section filters ran, 'YYYY-MM-DD' (their 12-week last-seen
+                              window is measured from it, so the counts only hold for that day)
+    """
+    counts = {
+        'active_devices': active_devices_key,
+        'reference_date': reference_date,
+        'sections': {section: {mode: int(n) for mode, n in mode_counts.items()}
+                     for section, mode_counts in section_counts.items()},
+    }
+    with open(get_counts_filename(path_report), 'w') as f:
+        json.dump(counts, f)
+
+def read_power_mode_counts(path_report):
+    """
+    Read the power mode counts sidecar of a report.
+    
+    Args:
+        path_report (str): Path of the report file
+        
+    Returns:
+        dict: {'active_devices': str or None, 'reference_date': 'YYYY-MM-DD', 'sections': {section: {PowerMode: count}}},
+              or None if there is no sidecar
+    """
+    try:
+        with open(get_counts_filename(path_report), 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
 def get_report_filename(date_str=None, use_old_query=True):
     """
-    Generate standardized report filename.
+    Generate standardized report filename (reports are stored as Parquet).
     
     Args:
         date_str (str, optional): Date in 'YYYY-MM-DD' format. If None, uses today.
@@ -52,13 +193,37 @@ def get_report_filename(date_str=None, use_old_query=True):
         str: Full path to the report file
     """
     if date_str:
-        date_obj = datetime.strptime(date_str, "%Y-%m-%d")
-        report_date = date_obj.strftime('%-d%b%y')
-    else:
-        report_date = datetime.now().strftime('%-d%b%y')
+        return _report_filename_for_date(date_str, use_old_query)
     
+    # "Today" changes over time, so this case is never cached
+    return _build_report_filename(format_date_for_filename(datetime.now()), use_old_query)
+
+@lru_cache(maxsize=1024)
+def _report_filename_for_date(date_str, use_old_query):
+    """
+    Cached get_report_filename for an explicit date (the weekly run asks for the same dates repeatedly).
+    """
+    date_obj = datetime.strptime(date_str, "%Y-%m-%d")
+    return _build_report_filename(format_date_for_filename(date_obj), use_old_query)
+
+def _build_report_filename(report_date, use_old_query):
     # Add database indicator to filename
     db_suffix = "debug" if use_old_query else "smbs"
-    filename = f"latest_batt_reports/latest_batt_{report_date}_{db_suffix}.csv"
+    return os.path.join(REPORTS_DIR, f"latest_batt_{report_date}_{db_suffix}.parquet")
+
+def get_chart_filename(prefix, report_date, use_old_query, active_filtered):
+    """
+    Path of a section chart, named after everything that changes what it shows.
     
-    return filename
\ No newline at end of file
+    Args:
+        prefix (str): Section chart prefix (e.g., 'new_pv_panel')
+        report_date (str): Report date in filename format (e.g., '5Jan26')
+        use_old_query (bool): Whether the chart is drawn from the DebugSMBs (True) or SMBs (False) report
+        active_filtered (bool): Whether the section was filtered to active devices
+        
+    Returns:
+        str: Full path to the chart PNG (e.g., 'latest_batt_reports/charts/new_pv_panel_5Jan26_smbs_active.png')
+    """
+    db_suffix = "debug" if use_old_query else "smbs"
+    filter_suffix = "active" if active_filtered else "all"
+    return os.path.join(CHARTS_DIR, f"{prefix}_{report_date}_{db_suffix}_{filter_suffix}.png")
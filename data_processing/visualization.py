@@ -11,6 +11,7 @@ import seaborn as sns
 import numpy as np
 from datetime import datetime
 from utils import format_date_for_display
+from data_processing.file_operations import CHARTS_DIR
 
 def create_snapshot_chart(latest_batt, IDs_list, report_date, paired=True, list_name='', path_save=None):
     """
@@ -18,7 +19,7 @@ def create_snapshot_chart(latest_batt, IDs_list, report_date, paired=True, list_
     
     Args:
         latest_batt (pandas.DataFrame): Battery data DataFrame
-        IDs_list (list): List of device IDs to include in chart
+        IDs_list (array-like): Device IDs to include in chart (only used for an isin membership test)
         report_date (str): Date string for the report
         paired (bool): If True, only include paired devices
         list_name (str): Name for the device list
@@ -29,7 +30,7 @@ def create_snapshot_chart(latest_batt, IDs_list, report_date, paired=True, list_
     """
     if path_save is None:
         timestamp = datetime.now().strftime("%H%M%S")
-        filename = f"latest_batt_reports/charts/snapshot_{report_date}_{timestamp}.png"
+        filename = os.path.join(CHARTS_DIR, f"snapshot_{report_date}_{timestamp}.png")
         path_save = filename
     
     # Define chart styling
@@ -46,7 +47,9 @@ def create_snapshot_chart(latest_batt, IDs_list, report_date, paired=True, list_
         cond_paired = (latest_batt['DeviceID'] != latest_batt['DeviceName'])
     else:
         cond_paired = latest_batt['CustomerName'].str.lower() == 'zim'
-    df = latest_batt[(latest_batt['DeviceID'].isin(IDs_list)) & cond_paired]
+    mask = latest_batt['DeviceID'].isin(IDs_list) & cond_paired
+    # The chart only counts PowerMode, so copy just that column for the selected rows
+    df = latest_batt.loc[mask, ['PowerMode']]
     
     # Create the chart
     plt.figure(figsize=(4, 6))
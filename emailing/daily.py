@@ -7,21 +7,129 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from emailing.credentials import EMAIL_CONFIG
-from database.queries import get_active_devices
-from reports.create_report_on_date import generate_battery_snapshot_report
-from data_processing.file_operations import read_df_with_metadata, get_report_filename
-from data_processing.data_filters import get_new_pv_panel_devices, get_zim_c_devices, get_samskip_devices, get_hmm_devices
-from data_processing.visualization import create_snapshot_chart
+from emailing.smtp_pool import send_messages
 from utils import prompt_for_date
 
-import pandas as pd
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from email.mime.image import MIMEImage
-from email.mime.base import MIMEBase
-from email import encoders
-import smtplib
-import io
+# Heavy modules (pandas, matplotlib, database and report modules) and the email.mime classes are
+# imported inside the functions that use them, so `--help` and importers such as emailing.weekly
+# do not pay for loading them
+
+# Power modes ordered from worst to best battery state
+POWER_MODE_ORDER = ['Critical', 'Low', 'Medium', 'High']
+
+# Power modes listed in the counts text, in display order
+_MODES = ('Critical', 'Low', 'Medium')
+
+def get_power_mode_text(counts):
+    """
+    Format power mode counts as 'Critical: n, Low: n, Medium: n'.
+    
+    Args:
+        counts (dict): PowerMode -> number of devices (missing modes count as 0)
+        
+    Returns:
+        str: Counts text for the email
+    """
+    get = counts.get
+    critical, low, medium = (get(mode, 0) for mode in _MODES)
+    return f"Critical: {critical}, Low: {low}, Medium: {medium}"
+
+# Email body layout; filled in with str.format_map by email_daily_report
+_HTML_TEMPLATE = """
+    <html>
+        <body>
+            <h2>Daily Battery Report - {query_type}</h2>
+            <p><strong>Performance:</strong> {msg}</p>
+            <br>
+            
+            <h3>Section 1: New PV Panel</h3>
+            <p><strong>Devices included in the statistics below:</strong></p>
+            <ul>
+                <li>Devices from Mila's list</li>
+                <li><strong>CustomerName = ZIM</strong> which are
+                    <ul>
+                        <li>paired</strong></li>
+                        <li>DeviceID starting with <strong>'A0'</strong></li>
+                        <li>DeviceID is 6000-series or higher</li>
+                    </ul>
+                </li>
+                <li>Only include reports from the last 12 weeks</li>
+                {active_note}
+            </ul>
+            <p><strong>Power Mode Counts:</strong> {new_pv_counts}</p>
+            {new_pv_img}
+            <h4>Critical, Low & Medium Battery Devices ({new_pv_total} devices):</h4>
+            {new_pv_more}
+            {new_pv_table}
+            <br><br>
+            
+            <h3>Section 2: ZIM C-Series Devices</h3>
+            <p><strong>Devices included in the statistics below:</strong></p>
+            <ul>
+                <li><strong>CustomerName = ZIM</strong> which are
+                    <ul>
+                        <li>paired</strong></li>
+                        <li>DeviceID starting with <strong>'C'</strong></li>
+                    </ul>
+                </li>
+                <li>Only include reports from the last 12 weeks</li>
+                {active_note}
+            </ul>
+            <p><strong>Power Mode Counts:</strong> {zim_c_counts}</p>
+            {zim_c_img}
+            <h4>Critical & Low Battery Devices ({zim_c_total} devices):</h4>
+            {zim_c_more}
+            {zim_c_table}
+            <br><br>
+            
+            <h3>Section 3: Samskip Devices</h3>
+            <p><strong>Devices included in the statistics below:</strong></p>
+            <ul>
+                <li><strong>CustomerName = Samskip</strong></li>
+                <li>paired</li>
+                <li>Only include reports from the last 12 weeks</li>
+                {active_note}
+            </ul>
+            <p><strong>Power Mode Counts:</strong> {samskip_counts}</p>
+            {samskip_img}
+            <h4>Critical, Low & Medium Battery Devices ({samskip_total} devices):</h4>
+            {samskip_more}
+            {samskip_table}
+            <br><br>
+            
+            <h3>Section 4: HMM Devices</h3>
+            <p><strong>Devices included in the statistics below:</strong></p>
+            <ul>
+                <li><strong>CustomerName = HMM</strong></li>
+                <li>paired</li>
+                <li>Only include reports from the last 12 weeks</li>
+                {active_note}
+            </ul>
+            <p><strong>Power Mode Counts:</strong> {hmm_counts}</p>
+            {hmm_img}
+            <h4>Critical, Low & Medium Battery Devices ({hmm_total} devices):</h4>
+            {hmm_more}
+            {hmm_table}
+        </body>
+    </html>
+    """
+
+def _chart_is_current(path_chart, report_mtime):
+    """
+    Check whether a chart was rendered after its report was last written.
+    
+    Args:
+        path_chart (str): Path to the chart PNG
+        report_mtime (float): Modification time of the report the chart is drawn from
+        
+    Returns:
+        bool: True if the chart exists and is at least as new as the report
+    """
+    # A single stat both checks that the chart exists and gets its modification time
+    try:
+        return os.stat(path_chart).st_mtime >= report_mtime
+    except OSError:
+        return False
 
 def add_table_attachment(email, table_df, table_name, report_date):
     """
@@ -36,6 +144,10 @@ def add_table_attachment(email, table_df, table_name, report_date):
     if len(table_df) == 0:
         return
     
+    import io
+    from email.mime.base import MIMEBase
+    from email import encoders
+    
     # Create CSV in memory
     csv_buffer = io.StringIO()
     table_df.to_csv(csv_buffer, index=False)
@@ -76,16 +188,30 @@ def get_table_html_with_limit(table_df, limit=30):
     html = limited_df.to_html(index=False)
     return html, True, total_rows
 
-def email_daily_report(manual_mode=False, use_old_query=False):
+def email_daily_report(manual_mode=False, use_old_query=False, specific_date=None, force_chart=False):
     """
     Send daily battery report via email.
     
     Args:
-        manual_mode (bool): If True, prompt for specific date
+        manual_mode (bool): If True and no specific_date, prompt for specific date
         use_old_query (bool): If True, use original query implementation
+        specific_date (str, optional): Date in 'YYYY-MM-DD' format, or None for latest
+        force_chart (bool): If True, redraw the section charts even if they are newer than the report
+        
+    Returns:
+        str: Report date string (e.g., "5Jan26"), or None if the report could not be generated
     """
-    specific_date = None
-    if manual_mode:
+    import pandas as pd
+    from database.queries import get_active_devices
+    from reports.create_report_on_date import generate_battery_snapshot_report
+    from data_processing.file_operations import read_df_with_metadata, get_report_filename, save_power_mode_counts, get_active_devices_key, get_chart_filename
+    from data_processing.data_filters import get_new_pv_panel_devices, get_zim_c_devices, get_samskip_devices, get_hmm_devices
+    from data_processing.visualization import create_snapshot_chart
+    from email.mime.multipart import MIMEMultipart
+    from email.mime.text import MIMEText
+    from email.mime.image import MIMEImage
+
+    if manual_mode and specific_date is None:
         specific_date = prompt_for_date()
     
     # Generate the report
@@ -93,13 +219,13 @@ def email_daily_report(manual_mode=False, use_old_query=False):
     
     if not report_date:
         print("❌ Failed to generate report")
-        return
+        return None
     
     # File paths
-    path_csv = get_report_filename(specific_date, use_old_query)
+    path_report = get_report_filename(specific_date, use_old_query)
 
     # Read the generated data
-    latest_batt, query_time = read_df_with_metadata(path_csv)
+    latest_batt, query_time = read_df_with_metadata(path_report)
     
     # Query active devices (only for SMBs database, skip for old query)
     # Query all active devices once, then filter in Python (can't include large lists in SQL)
@@ -107,8 +233,9 @@ def email_daily_report(manual_mode=False, use_old_query=False):
     if not use_old_query:
         try:
             active_devices_df, _ = get_active_devices()
-            # Get set of active device IDs (DeviceID only - filtering done in Python)
-            active_device_ids = set(active_devices_df['DeviceID'].dropna().tolist())
+            # Keep the active device IDs as a pandas Index (DeviceID only - filtering done in Python);
+            # the section filters' isin() uses it directly without boxing every ID into a Python set
+            active_device_ids = pd.Index(active_devices_df['DeviceID'].dropna().unique())
             print(f"✅ Found {len(active_device_ids)} active devices")
         except Exception as e:
             print(f"⚠️ Warning: Could not query active devices: {e}")
@@ -128,75 +255,112 @@ def email_daily_report(manual_mode=False, use_old_query=False):
     hmm_devices = get_hmm_devices(latest_batt, active_device_ids)
     hmm_counts = hmm_devices['PowerMode'].value_counts().to_dict() if len(hmm_devices) > 0 else {}
     
-    # Create section charts (only if devices exist)
+    # Store the counts next to the report so the weekly email (SMBs only) does not have to re-read it
+    if not use_old_query:
+        try:
+            save_power_mode_counts(
+                path_report,
+                {'new_pv': new_pv_counts, 'zim_c': zim_c_counts, 'samskip': samskip_counts, 'hmm': hmm_counts},
+                get_active_devices_key(active_device_ids),
+                pd.Timestamp.today().strftime('%Y-%m-%d')
+            )
+        except Exception as e:
+            print(f"⚠️ Warning: Could not save power mode counts: {e}")
+    
+    # Create section charts (only if devices exist), reusing charts already drawn from this report.
+    # Chart names include the database and the active filter, so a chart is only reused for the same data
     chart_paths = {}
+    active_filtered = active_device_ids is not None
+    # Stat the report once for all four charts' staleness checks
+    report_mtime = os.stat(path_report).st_mtime
+    
+    def chart_needed(section, path_chart):
+        # Returns False (and records the existing chart) if the chart can be reused
+        if not force_chart and _chart_is_current(path_chart, report_mtime):
+            print(f"📊 Using existing chart: {path_chart}")
+            chart_paths[section] = path_chart
+            return False
+        return True
     
     # Section 1: New PV Panel - show all power modes
-    if len(new_pv_devices) > 0:
-        new_pv_ids = list(new_pv_devices['DeviceID'])
+    path_chart = get_chart_filename('new_pv_panel', report_date, use_old_query, active_filtered)
+    if len(new_pv_devices) > 0 and chart_needed('new_pv', path_chart):
+        new_pv_ids = new_pv_devices['DeviceID'].to_numpy()
         chart_paths['new_pv'] = create_snapshot_chart(
             latest_batt, 
             new_pv_ids, 
             report_date, 
             paired=True, 
             list_name="New PV Panel", 
-            path_save=f"latest_batt_reports/charts/new_pv_panel_{report_date}.png"
+            path_save=path_chart
         )
     
     # Section 2: ZIM C Devices - show all power modes
-    if len(zim_c_devices) > 0:
-        zim_c_ids = list(zim_c_devices['DeviceID'])
+    path_chart = get_chart_filename('zim_c_devices', report_date, use_old_query, active_filtered)
+    if len(zim_c_devices) > 0 and chart_needed('zim_c', path_chart):
+        zim_c_ids = zim_c_devices['DeviceID'].to_numpy()
         chart_paths['zim_c'] = create_snapshot_chart(
             latest_batt, 
             zim_c_ids, 
             report_date, 
             paired=True, 
             list_name="ZIM C-series Devices", 
-            path_save=f"latest_batt_reports/charts/zim_c_devices_{report_date}.png"
+            path_save=path_chart
         )
     
     # Section 3: samskip Devices - show all power modes
-    if len(samskip_devices) > 0:
-        samskip_ids = list(samskip_devices['DeviceID'])
+    path_chart = get_chart_filename('samskip_devices', report_date, use_old_query, active_filtered)
+    if len(samskip_devices) > 0 and chart_needed('samskip', path_chart):
+        samskip_ids = samskip_devices['DeviceID'].to_numpy()
         chart_paths['samskip'] = create_snapshot_chart(
             latest_batt, 
             samskip_ids, 
             report_date, 
             paired=True,
             list_name="Samskip Devices", 
-            path_save=f"latest_batt_reports/charts/samskip_devices_{report_date}.png"
+            path_save=path_chart
         )
     
     # Section 4: HMM Devices - show all power modes
-    if len(hmm_devices) > 0:
-        hmm_ids = list(hmm_devices['DeviceID'])
+    path_chart = get_chart_filename('hmm_devices', report_date, use_old_query, active_filtered)
+    if len(hmm_devices) > 0 and chart_needed('hmm', path_chart):
+        hmm_ids = hmm_devices['DeviceID'].to_numpy()
         chart_paths['hmm'] = create_snapshot_chart(
             latest_batt, 
             hmm_ids, 
             report_date, 
             paired=True,
             list_name="HMM Devices", 
-            path_save=f"latest_batt_reports/charts/hmm_devices_{report_date}.png"
+            path_save=path_chart
         )
     
     # Prepare data for tables
+    # Encode PowerMode once as ordered codes (Critical=0, Low=1, Medium=2, High=3, anything else=-1)
+    # so each section's table filter is an integer compare instead of a hash-based isin
+    power_mode_codes = pd.Series(
+        pd.Categorical(latest_batt['PowerMode'], categories=POWER_MODE_ORDER, ordered=True).codes,
+        index=latest_batt.index
+    )
+    below_high = (power_mode_codes >= 0) & (power_mode_codes <= 2)
+    below_medium = (power_mode_codes >= 0) & (power_mode_codes <= 1)
+    
     # Section 1: New PV Panel - all critical, low, medium
-    new_pv_table = new_pv_devices[new_pv_devices['PowerMode'].isin(['Critical', 'Low', 'Medium'])].copy()
+    new_pv_table = new_pv_devices[below_high.loc[new_pv_devices.index]].copy()
     new_pv_table = new_pv_table.drop(['PayloadData', 'index', 'AssetId', 'OrganizationId'], axis=1, errors='ignore')
     new_pv_table.sort_values(by='Voltage', inplace=True)
     
     # Section 2: ZIM C devices - only critical and low, but show medium count
-    zim_c_table = zim_c_devices[zim_c_devices['PowerMode'].isin(['Critical', 'Low'])].copy()
+    zim_c_table = zim_c_devices[below_medium.loc[zim_c_devices.index]].copy()
     zim_c_table = zim_c_table.drop(['PayloadData', 'index', 'AssetId', 'OrganizationId'], axis=1, errors='ignore')
     zim_c_table.sort_values(by='Voltage', inplace=True)
     
     # Section 3: samskip devices - critical, low, and medium
-    samskip_table = samskip_devices[samskip_devices['PowerMode'].isin(['Critical', 'Low', 'Medium'])].copy()
+    samskip_table = samskip_devices[below_high.loc[samskip_devices.index]].copy()
     samskip_table = samskip_table.drop(['PayloadData', 'index', 'AssetId', 'OrganizationId'], axis=1, errors='ignore')
     samskip_table.sort_values(by='Voltage', inplace=True)
     
     # Section 4: HMM devices - critical, low, and medium
-    hmm_table = hmm_devices[hmm_devices['PowerMode'].isin(['Critical', 'Low', 'Medium'])].copy()
+    hmm_table = hmm_devices[below_high.loc[hmm_devices.index]].copy()
     hmm_table = hmm_table.drop(['PayloadData', 'index', 'AssetId', 'OrganizationId'], axis=1, errors='ignore')
     hmm_table.sort_values(by='Voltage', inplace=True)
     
@@ -222,8 +386,7 @@ def email_daily_report(manual_mode=False, use_old_query=False):
     # Add images (only for sections with data)
     for section, chart_path in chart_paths.items():
         with open(chart_path, 'rb') as f:
-            img_data = f.read()
-        img_part = MIMEImage(img_data)
+            img_part = MIMEImage(f.read())
         img_part.add_header('Content-ID', f'<{section}_chart>')
         email.attach(img_part)
     
@@ -237,100 +400,27 @@ def email_daily_report(manual_mode=False, use_old_query=False):
     if hmm_has_more:
         add_table_attachment(email, hmm_table, "hmm_devices", report_date)
     
-    # Helper function to get power mode counts
-    def get_power_mode_text(counts):
-        critical = counts.get('Critical', 0)
-        low = counts.get('Low', 0)
-        medium = counts.get('Medium', 0)
-        return f"Critical: {critical}, Low: {low}, Medium: {medium}"
-    
-    # Add HTML content
-    html = f"""
-    <html>
-        <body>
-            <h2>Daily Battery Report - {query_type}</h2>
-            <p><strong>Performance:</strong> {msg}</p>
-            <br>
-            
-            <h3>Section 1: New PV Panel</h3>
-            <p><strong>Devices included in the statistics below:</strong></p>
-            <ul>
-                <li>Devices from Mila's list</li>
-                <li><strong>CustomerName = ZIM</strong> which are
-                    <ul>
-                        <li>paired</strong></li>
-                        <li>DeviceID starting with <strong>'A0'</strong></li>
-                        <li>DeviceID is 6000-series or higher</li>
-                    </ul>
-                </li>
-                <li>Only include reports from the last 12 weeks</li>
-                {'<li><strong>Device status = Active</strong> (filtered from AssetsView)</li>' if active_device_ids is not None else ''}
-            </ul>
-            <p><strong>Power Mode Counts:</strong> {get_power_mode_text(new_pv_counts)}</p>
-            {'<img src="cid:new_pv_chart" style="display:block;"><br>' if 'new_pv' in chart_paths else ''}
-            <h4>Critical, Low & Medium Battery Devices ({new_pv_total} devices):</h4>
-            {f'<p><em>Showing first 30 of {new_pv_total} devices. Full data attached as CSV.</em></p>' if new_pv_has_more else ''}
-            {new_pv_html}
-            <br><br>
-            
-            <h3>Section 2: ZIM C-Series Devices</h3>
-            <p><strong>Devices included in the statistics below:</strong></p>
-            <ul>
-                <li><strong>CustomerName = ZIM</strong> which are
-                    <ul>
-                        <li>paired</strong></li>
-                        <li>DeviceID starting with <strong>'C'</strong></li>
-                    </ul>
-                </li>
-                <li>Only include reports from the last 12 weeks</li>
-                {'<li><strong>Device status = Active</strong> (filtered from AssetsView)</li>' if active_device_ids is not None else ''}
-            </ul>
-            <p><strong>Power Mode Counts:</strong> {get_power_mode_text(zim_c_counts)}</p>
-            {'<img src="cid:zim_c_chart" style="display:block;"><br>' if 'zim_c' in chart_paths else ''}
-            <h4>Critical & Low Battery Devices ({zim_c_total} devices):</h4>
-            {f'<p><em>Showing first 30 of {zim_c_total} devices. Full data attached as CSV.</em></p>' if zim_c_has_more else ''}
-            {zim_c_html}
-            <br><br>
-            
-            <h3>Section 3: Samskip Devices</h3>
-            <p><strong>Devices included in the statistics below:</strong></p>
-            <ul>
-                <li><strong>CustomerName = Samskip</strong></li>
-                <li>paired</li>
-                <li>Only include reports from the last 12 weeks</li>
-                {'<li><strong>Device status = Active</strong> (filtered from AssetsView)</li>' if active_device_ids is not None else ''}
-            </ul>
-            <p><strong>Power Mode Counts:</strong> {get_power_mode_text(samskip_counts)}</p>
-            {'<img src="cid:samskip_chart" style="display:block;"><br>' if 'samskip' in chart_paths else ''}
-            <h4>Critical, Low & Medium Battery Devices ({samskip_total} devices):</h4>
-            {f'<p><em>Showing first 30 of {samskip_total} devices. Full data attached as CSV.</em></p>' if samskip_has_more else ''}
-            {samskip_html}
-            <br><br>
-            
-            <h3>Section 4: HMM Devices</h3>
-            <p><strong>Devices included in the statistics below:</strong></p>
-            <ul>
-                <li><strong>CustomerName = HMM</strong></li>
-                <li>paired</li>
-                <li>Only include reports from the last 12 weeks</li>
-                {'<li><strong>Device status = Active</strong> (filtered from AssetsView)</li>' if active_device_ids is not None else ''}
-            </ul>
-            <p><strong>Power Mode Counts:</strong> {get_power_mode_text(hmm_counts)}</p>
-            {'<img src="cid:hmm_chart" style="display:block;"><br>' if 'hmm' in chart_paths else ''}
-            <h4>Critical, Low & Medium Battery Devices ({hmm_total} devices):</h4>
-            {f'<p><em>Showing first 30 of {hmm_total} devices. Full data attached as CSV.</em></p>' if hmm_has_more else ''}
-            {hmm_html}
-        </body>
-    </html>
-    """
+    # Fill in the HTML template (static layout at module level, only the per-section parts vary)
+    active_note = '<li><strong>Device status = Active</strong> (filtered from AssetsView)</li>' if active_device_ids is not None else ''
+    subs = {'query_type': query_type, 'msg': msg, 'active_note': active_note}
+    section_results = {
+        'new_pv': (new_pv_counts, new_pv_html, new_pv_has_more, new_pv_total),
+        'zim_c': (zim_c_counts, zim_c_html, zim_c_has_more, zim_c_total),
+        'samskip': (samskip_counts, samskip_html, samskip_has_more, samskip_total),
+        'hmm': (hmm_counts, hmm_html, hmm_has_more, hmm_total),
+    }
+    for section, (counts, table_html, has_more, total) in section_results.items():
+        subs[f'{section}_counts'] = get_power_mode_text(counts)
+        subs[f'{section}_img'] = f'<img src="cid:{section}_chart" style="display:block;"><br>' if section in chart_paths else ''
+        subs[f'{section}_more'] = f'<p><em>Showing first 30 of {total} devices. Full data attached as CSV.</em></p>' if has_more else ''
+        subs[f'{section}_total'] = total
+        subs[f'{section}_table'] = table_html
+    html = _HTML_TEMPLATE.format_map(subs)
     html_part = MIMEText(html, 'html')
     email.attach(html_part)
 
     # Send email
-    with smtplib.SMTP('smtp.gmail.com', 587) as server:
-        server.starttls()
-        server.login(EMAIL_CONFIG['sender'], EMAIL_CONFIG['password'])
-        server.send_message(email)
+    send_messages([email])
     
     print(f"✅ Email sent successfully using {query_type}")
     print(f"📊 Report date: {report_date}")
@@ -357,13 +447,29 @@ def email_daily_report(manual_mode=False, use_old_query=False):
         print(f"📎 CSV attachments: {', '.join(attachments)}")
     else:
         print("📎 No CSV attachments (all tables ≤ 30 rows)")
+    
+    return report_date
+
+def generate_report_for_date(date_str, use_old_query=False):
+    """
+    Generate and email the daily report for a specific date (non-interactive).
+    
+    Args:
+        date_str (str): Date in 'YYYY-MM-DD' format
+        use_old_query (bool): If True, use original query implementation
+        
+    Returns:
+        bool: True if the report was generated and sent, False otherwise
+    """
+    return email_daily_report(use_old_query=use_old_query, specific_date=date_str) is not None
 
 if __name__ == "__main__":
-    # Parse command line arguments
-    manual_mode = "--manual" in sys.argv
-    use_old_query = "--old" in sys.argv
+    # Parse command line arguments (as a set, so each flag check is a single lookup)
+    args = set(sys.argv[1:])
+    manual_mode = "--manual" in args
+    use_old_query = "--old" in args
     
-    if "--help" in sys.argv or "-h" in sys.argv:
+    if args & {"--help", "-h"}:
         print("Usage: python emailing/daily.py [options]")
         print("Options:")
         print("  --manual    Prompt for specific date")
@@ -380,5 +486,11 @@ if __name__ == "__main__":
         print("      Use --old flag for DebugSMBs database.")
         sys.exit(0)
     
+    # Messages from the shared modules go through logging (LOGLEVEL=WARNING quiets them)
+    import logging
+    logging.basicConfig(level=os.environ.get("LOGLEVEL", "INFO").upper(), format="%(message)s")
+    
     # Use the query method based on the flag (SMBs by default, DebugSMBs with --old)
+    from data_processing.file_operations import ensure_dirs
+    ensure_dirs()
     email_daily_report(manual_mode, use_old_query)
@@ -0,0 +1,138 @@
+"""
+Shared SMTP session handling for battery report emails.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import smtplib
+import time
+import logging
+import atexit
+from contextlib import contextmanager
+from emailing.credentials import EMAIL_CONFIG
+
+# Implicit TLS (port 465) avoids the extra STARTTLS round trip of port 587
+SMTP_HOST = 'smtp.gmail.com'
+SMTP_PORT = 465
+# Fail fast on a stalled connection instead of waiting on the OS socket timeout
+SMTP_TIMEOUT = 30
+
+log = logging.getLogger(__name__)
+
+# Logged-in connection kept between send_messages calls when running as a long-lived process
+_session = None
+
+def close_smtp_session():
+    """
+    Log out of the cached SMTP connection, if any.
+    """
+    global _session
+    if _session is None:
+        return
+    server, _session = _session, None
+    try:
+        server.quit()
+    except (smtplib.SMTPException, OSError):
+        server.close()
+
+# Let one-shot runs log out cleanly instead of dropping the connection at exit
+atexit.register(close_smtp_session)
+
+@contextmanager
+def smtp_session():
+    """
+    Yield a logged-in SMTP connection, reusing the previous one while it is still alive.
+    
+    A one-shot run opens a single connection as before; a long-running process skips
+    the TLS handshake and login on every send after the first. A connection that fails
+    while in use is dropped so the next session reconnects.
+    
+    Yields:
+        smtplib.SMTP_SSL: Logged-in SMTP connection
+    """
+    global _session
+    if _session is not None:
+        try:
+            alive = _session.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            alive = False
+        if not alive:
+            close_smtp_session()
+    
+    if _session is None:
+        server = smtplib.SMTP_SSL(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT)
+        try:
+            server.ehlo()
+            server.login(EMAIL_CONFIG['sender'], EMAIL_CONFIG['password'])
+        except BaseException:
+            server.close()
+            raise
+        _session = server
+    
+    try:
+        yield _session
+    except (smtplib.SMTPException, OSError):
+        close_smtp_session()
+        raise
+
+def _is_transient(error):
+    """
+    Whether a send failure may succeed on retry.
+    
+    Dropped connections, network errors and 4xx replies are temporary; 5xx replies
+    (bad credentials, refused sender or recipients, message too large, ...) are not.
+    
+    Args:
+        error (Exception): Error raised while sending
+        
+    Returns:
+        bool: True if the send should be retried
+    """
+    if isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError)):
+        return True
+    if isinstance(error, smtplib.SMTPResponseException):
+        return error.smtp_code < 500
+    # SMTPException subclasses OSError, so plain network errors are the OSErrors that are not SMTP ones;
+    # SMTPRecipientsRefused and the remaining SMTPException types are not retried
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+def send_messages(messages, max_attempts=3, backoff_seconds=2):
+    """
+    Send several emails over a single SMTP session.
+
+    Opening the connection (TLS handshake + login) is the expensive part of
+    sending, so reports that run together should be sent in one call; the
+    connection is also kept open for later calls (see smtp_session).
+    Transient failures (see _is_transient) are retried with exponential backoff
+    so a flaky network does not force the whole report to be rebuilt; messages
+    already sent are not sent again. Permanent (5xx) failures are raised right
+    away.
+    
+    Note that a connection dropped after the end of DATA, before the server's
+    reply arrives, cannot be told apart from one dropped earlier: the message
+    is sent again and may reach every recipient twice.
+
+    Args:
+        messages (list): List of email.message.Message objects to send
+        max_attempts (int): Number of connection attempts before giving up
+        backoff_seconds (float): Delay before the first retry, doubled after each failure
+    """
+    pending = list(messages)
+    if not pending:
+        return
+    
+    for attempt in range(1, max_attempts + 1):
+        try:
+            with smtp_session() as server:
+                while pending:
+                    server.send_message(pending[0])
+                    pending.pop(0)
+            return
+        except (smtplib.SMTPException, OSError) as e:
+            if attempt == max_attempts or not _is_transient(e):
+                raise
+            delay = backoff_seconds * 2 ** (attempt - 1)
+            log.warning(f"⚠️ Warning: Sending email failed ({e}), retrying in {delay} seconds...")
+            time.sleep(delay)
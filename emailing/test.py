@@ -6,23 +6,21 @@ import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-import smtplib
-from emailing.credentials import EMAIL_CONFIG
+from emailing.smtp_pool import smtp_session
 
 def test_email_connection():
     """
     Test email connection and credentials.
     
+    Uses the same (cached, implicit TLS) session as the report emails, so a
+    successful check leaves a logged-in connection for the next send.
+    
     Returns:
         bool: True if connection successful, False otherwise
     """
-    sender = EMAIL_CONFIG['sender']
-    app_password = EMAIL_CONFIG['password']
-
     try:
-        with smtplib.SMTP("smtp.gmail.com", 587) as server:
-            server.starttls()
-            server.login(sender, app_password)
+        with smtp_session():
+            pass
         print("✅ Login successful")
         return True
     except Exception as e:
@@ -18,7 +18,7 @@ def get_emailed_dates():
     try:
         with open(path_emailed_dates, 'r') as f:
             dates = [line.strip() for line in f.read().splitlines() if line.strip()]
-        return sorted(dates, key=lambda x: parse_date_flexible(x))
+        return sorted(dates, key=parse_date_flexible)
     except FileNotFoundError:
         return []
 
@@ -3,81 +3,200 @@ Weekly battery report email functionality.
 """
 
 import os
-import pandas as pd
+import re
+import io
+import logging
+import contextlib
+import multiprocessing
 from datetime import datetime, timedelta
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from email.mime.image import MIMEImage
-import smtplib
-import subprocess
 import sys
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from emailing.credentials import EMAIL_CONFIG
-from database.queries import get_active_devices, get_power_mode_statistics, get_organization_names, get_total_device_count
-from data_processing.file_operations import read_df_with_metadata, get_report_filename
-from data_processing.data_filters import get_new_pv_panel_devices, get_zim_c_devices, get_samskip_devices, get_hmm_devices
-from data_processing.visualization import create_snapshot_chart, plot_power_stats_combined
+from emailing.smtp_pool import send_messages
+from emailing.daily import generate_report_for_date
+from data_processing.file_operations import ensure_dirs, get_report_filename, convert_legacy_report, get_chart_filename, get_active_devices_key, REPORTS_DIR, CHARTS_DIR
 from emailing.tracking import get_emailed_dates, update_emailed_dates
 from utils import format_date_for_filename, parse_date_flexible
 
+log = logging.getLogger(__name__)
+
+# pandas, matplotlib, email.mime and the database/data-processing modules are imported inside the functions
+# that use them, after the "no reports to send" exit, so a run with nothing to send stays fast
+
+# Matches report filenames like 'latest_batt_5Jan26_smbs.parquet' (or legacy '.csv'), capturing the date part
+REPORT_FILENAME_RE = re.compile(r"latest_batt_(\d{1,2}[A-Za-z]{3}\d{2})(?:_smbs|_debug)?\.(?:parquet|csv)")
+
+# Power modes counted per date in the weekly report
+POWER_MODES = ['Critical', 'Low', 'Medium', 'High']
+
+# Low-cardinality report columns parsed as categoricals
+SECTION_DTYPES = {'CustomerName': 'category', 'PowerMode': 'category'}
+
+# Report sections as (key, chart label, chart filename prefix)
+SECTIONS = (
+    ('new_pv', 'New PV Panel', 'new_pv_panel'),
+    ('zim_c', 'ZIM C', 'zim_c_devices'),
+    ('samskip', 'Samskip', 'samskip_devices'),
+    ('hmm', 'HMM', 'hmm_devices'),
+)
+
+# Static HTML for each section, built once at import; only {chart_html} and {active_note} vary per run
+SECTION1_HEAD = """
+            <h3>Section 1: New PV Panel</h3>
+            <p><strong>Devices included in the statistics below:</strong></p>
+            <ul>
+                <li>Devices from Mila's list</li>
+                <li><strong>CustomerName = ZIM</strong> which are
+                    <ul>
+                        <li>paired</strong></li>
+                        <li>DeviceID starting with <strong>'A0'</strong></li>
+                        <li>DeviceID is 6000-series or higher</li>
+                    </ul>
+                </li>
+                <li>Only include reports from the last 12 weeks</li>
+                {active_note}
+            </ul>
+            {chart_html}
+            <h4>Power Mode Counts by Date:</h4>
+"""
+
+SECTION2_HEAD = """
+            <br><br>
+            
+            <h3>Section 2: ZIM C-Series Devices</h3>
+            <p><strong>Devices included in the statistics below:</strong></p>
+            <ul>
+                <li><strong>CustomerName = ZIM</strong> which are
+                    <ul>
+                        <li>paired</strong></li>
+                        <li>DeviceID starting with <strong>'C'</strong></li>
+                    </ul>
+                </li>
+                <li>Only include reports from the last 12 weeks</li>
+                {active_note}
+            </ul>
+            {chart_html}
+            <h4>Power Mode Counts by Date:</h4>
+"""
+
+SECTION3_HEAD = """
+            <br><br>
+            
+            <h3>Section 3: Samskip Devices</h3>
+            <p><strong>Devices included in the statistics below:</strong></p>
+            <ul>
+                <li><strong>CustomerName = Samskip</strong></li>
+                <li>paired</li>
+                <li>Only include reports from the last 12 weeks</li>
+                {active_note}
+            </ul>
+            {chart_html}
+            <h4>Power Mode Counts by Date:</h4>
+"""
+
+SECTION4_HEAD = """
+            <br><br>
+            
+            <h3>Section 4: HMM Devices</h3>
+            <p><strong>Devices included in the statistics below:</strong></p>
+            <ul>
+                <li><strong>CustomerName = HMM</strong></li>
+                <li>paired</li>
+                <li>Only include reports from the last 12 weeks</li>
+                {active_note}
+            </ul>
+            {chart_html}
+            <h4>Power Mode Counts by Date:</h4>
+"""
+
+# One line of power mode counts for a single date
+ROW_TEMPLATE = "            <p><strong>{date}:</strong> Critical: {Critical}, Low: {Low}, Medium: {Medium}</p>\n"
 
 def generate_missing_report(date_str):
     """
-    Generate a report for a specific date using the daily.py script.
+    Generate a report for a specific date by running the daily report in this process.
+    
+    Runs in a worker process, so everything the daily report prints or logs is captured and
+    returned with the outcome; the parent prints it per date, so parallel workers do not interleave.
     
     Args:
         date_str (str): Date in 'YYYY-MM-DD' format
         
     Returns:
-        bool: True if successful, False otherwise
+        tuple: (date_str, success, error message or None, captured output)
     """
-    try:
-        # Get the project root directory
-        project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        
-        # Use shell=True to properly activate the virtual environment
-        # This mimics the behavior of the Automator apps
-        cmd = f"""
-        cd "{project_root}" && 
-        source venv/bin/activate && 
-        python emailing/daily.py --manual
-        """
-        
-        # Use subprocess with shell=True and input to provide the date
-        process = subprocess.Popen(
-            cmd,
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            shell=True
-        )
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+        # A spawned worker has no logging setup of its own; send its log records to the capture too
+        logging.basicConfig(level=os.environ.get("LOGLEVEL", "INFO").upper(), format="%(message)s",
+                            stream=output, force=True)
+        try:
+            generated, error = bool(generate_report_for_date(date_str)), None
+        except Exception as e:
+            generated, error = False, str(e)
+    return date_str, generated, error, output.getvalue()
+
+
+def _snapshot_dir(path):
+    """
+    Scan a directory once so existence checks become set lookups instead of stat calls.
+    
+    Args:
+        path (str): Directory to scan
         
-        # Send the date as input to the manual prompt
-        stdout, stderr = process.communicate(input=date_str + '\n')
+    Returns:
+        set: Names of the regular files in the directory (empty if it does not exist)
+    """
+    try:
+        with os.scandir(path) as entries:
+            # DirEntry.is_file uses the file type returned by the directory scan, so this needs no extra stat
+            return {entry.name for entry in entries if entry.is_file()}
+    except FileNotFoundError:
+        return set()
+
+
+def _report_names(date_str):
+    """
+    Filenames a report for the given date can have (DebugSMBs and SMBs versions).
+    
+    Args:
+        date_str (str): Date in 'YYYY-MM-DD' format
         
-        if process.returncode == 0:
-            print(f"✅ Successfully generated report for {date_str}")
-            return True
-        else:
-            print(f"❌ Failed to generate report for {date_str}")
-            print(f"Error: {stderr}")
-            return False
-            
-    except Exception as e:
-        print(f"❌ Exception generating report for {date_str}: {str(e)}")
-        return False
+    Returns:
+        set: Report basenames to look for in a _snapshot_dir set
+    """
+    return {os.path.basename(get_report_filename(date_str, True)),   # DebugSMBs
+            os.path.basename(get_report_filename(date_str, False))}  # SMBs
+
+
+def _convert_legacy_for_date(date_str, reports_set):
+    """
+    Convert the legacy CSV reports of one date that have no Parquet version yet.
+    
+    Only the dates a run looks at are converted, so an unreadable old CSV elsewhere in the
+    directory cannot break the run; one that fails to convert just counts as missing.
+    
+    Args:
+        date_str (str): Date in 'YYYY-MM-DD' format
+        reports_set (set): Filenames from _snapshot_dir; converted reports are added to it
+    """
+    for name in _report_names(date_str):
+        if name not in reports_set and name[:-len('.parquet')] + '.csv' in reports_set:
+            if convert_legacy_report(os.path.join(REPORTS_DIR, name)):
+                reports_set.add(name)
 
 
-def find_missing_dates(emailed_dates, today_date):
+def find_missing_dates(emailed_dates, today_date, reports_set=None):
     """
     Find dates between the last emailed date and today that need reports.
     
     Args:
         emailed_dates (list): List of already emailed date strings
         today_date (datetime): Today's date
+        reports_set (set): Filenames in latest_batt_reports from _snapshot_dir (scanned here if not given)
         
     Returns:
         list: List of missing date strings in 'YYYY-MM-DD' format
@@ -86,451 +205,281 @@ def find_missing_dates(emailed_dates, today_date):
         # If no emails sent yet, start from 7 days ago
         start_date = today_date - timedelta(days=7)
     else:
-        # Find the most recent emailed date (handle both formats)
-        last_emailed_str = max(emailed_dates, key=lambda x: parse_date_flexible(x))
-        last_emailed = parse_date_flexible(last_emailed_str)
+        # Find the most recent emailed date in a single pass (handle both formats)
+        last_emailed = max(parse_date_flexible(d) for d in emailed_dates)
         start_date = last_emailed + timedelta(days=1)
     
+    # List the reports directory once instead of stat-ing two paths per day
+    if reports_set is None:
+        reports_set = _snapshot_dir(REPORTS_DIR)
+    
     missing_dates = []
     current_date = start_date
     
     while current_date <= today_date:
-        # Check if report already exists for this date
+        # Check if report already exists for this date (either the regular or the SMBs version)
         date_str = current_date.strftime("%Y-%m-%d")
-        date_file = format_date_for_filename(current_date)
+        _convert_legacy_for_date(date_str, reports_set)
         
-        # Check for both regular and SMBs versions
-        regular_path = get_report_filename(date_str, True)  # DebugSMBs
-        smbs_path = get_report_filename(date_str, False)    # SMBs
-        
-        if not os.path.exists(regular_path) and not os.path.exists(smbs_path):
+        if _report_names(date_str).isdisjoint(reports_set):
             missing_dates.append(date_str)
-            print(f"📅 Missing report for {date_str}")
+            log.info(f"📅 Missing report for {date_str}")
         else:
-            print(f"✅ Report exists for {date_str}")
+            log.info(f"✅ Report exists for {date_str}")
             
         current_date += timedelta(days=1)
     
     return missing_dates
 
 
-def email_weekly_report(use_emailed_dates_tracking=False, debug_mode=False):
+def _read_date(date, date_iso, active_devices_key, reference_date):
     """
-    Send weekly report with reports from the last 7 days.
-    Optionally can use emailed_dates.txt tracking (deprecated).
+    Read the SMBs report for one date, or just its power mode counts if the daily report saved them.
     
     Args:
-        use_emailed_dates_tracking (bool): If True, use old tracking system based on emailed_dates.txt.
-                                          If False (default), send last 7 days from today.
-        debug_mode (bool): If True, send only to rashel. If False, send to all recipients.
+        date (str): Date string in filename format (e.g., '5Jan26')
+        date_iso (str): The same date in 'YYYY-MM-DD' format
+        active_devices_key (str): get_active_devices_key of this run's active devices (None if unfiltered)
+        reference_date (str): Today's date in 'YYYY-MM-DD' format (the section filters' last-seen reference)
+        
+    Returns:
+        tuple: (date, DataFrame or section counts dict or None, error message or None)
     """
-    print("🔄 Starting weekly report process...")
-    
-    # Get current date
-    today = datetime.now()
+    from data_processing.file_operations import read_df_with_metadata, read_power_mode_counts
+    from data_processing.data_filters import SECTION_FILTER_COLUMNS
+    
+    # Read existing report data (no generation needed)
+    path_report = get_report_filename(date_iso, False)  # SMBs database
+    log.debug(f"📁 Reading report for {date}: {path_report}")
+    
+    if not os.path.exists(path_report) and not convert_legacy_report(path_report):
+        return date, None, f"Report file not found: {path_report}"
+    
+    # The counts sidecar can stand in for the report only if its section filters ran today (their 12-week
+    # last-seen window moves with the date) with the same active device list as this run; otherwise the
+    # counts are recomputed from the report, so every date in the email is counted the same way
+    saved = read_power_mode_counts(path_report)
+    if (saved is not None and saved.get('reference_date') == reference_date
+            and 'active_devices' in saved and saved['active_devices'] == active_devices_key):
+        section_counts = {section: {mode: mode_counts.get(mode, 0) for mode in ('Critical', 'Low', 'Medium')}
+                          for section, mode_counts in saved['sections'].items()}
+        return date, section_counts, None
     
-    if use_emailed_dates_tracking:
-        # OLD MODE: Use emailed_dates.txt tracking (deprecated)
-        emailed_dates = get_emailed_dates()
-        print(f"📅 Today's date: {format_date_for_filename(today)}")
-        print(f"📧 Last emailed dates: {emailed_dates[-5:] if len(emailed_dates) > 5 else emailed_dates}")
-        
-        # Find missing dates that need report generation
-        missing_dates = find_missing_dates(emailed_dates, today)
-    else:
-        # NEW MODE: Last 7 days from today
-        print(f"📅 Today's date: {format_date_for_filename(today)}")
-        print("📊 Using last 7 days mode (emailed_dates.txt tracking disabled)")
-        
-        # Get last 7 days (including today)
-        date_range = []
-        for i in range(7):
-            date = today - timedelta(days=i)
-            date_range.append(date)
-        date_range.reverse()  # Oldest to newest
-        
-        # Check which dates need report generation
-        missing_dates = []
-        for date in date_range:
-            date_str = date.strftime("%Y-%m-%d")
-            date_file = format_date_for_filename(date)
-            
-            # Check for both regular and SMBs versions
-            regular_path = get_report_filename(date_str, True)  # DebugSMBs
-            smbs_path = get_report_filename(date_str, False)    # SMBs
-            
-            if not os.path.exists(regular_path) and not os.path.exists(smbs_path):
-                missing_dates.append(date_str)
-                print(f"📅 Missing report for {date_str}")
-            else:
-                print(f"✅ Report exists for {date_str}")
+    try:
+        # Only parse the columns the section filters and power mode counts use
+        latest_batt, _ = read_df_with_metadata(path_report, usecols=SECTION_FILTER_COLUMNS, dtype=SECTION_DTYPES)
+    except Exception as e:
+        return date, None, f"Error reading report: {str(e)}"
     
-    if missing_dates:
-        print(f"🔧 Generating {len(missing_dates)} missing reports...")
-        successful_generations = 0
-        failed_generations = 0
-        failed_dates = []
-        
-        for date_str in missing_dates:
-            if generate_missing_report(date_str):
-                successful_generations += 1
-            else:
-                failed_generations += 1
-                failed_dates.append(date_str)
-                print(f"⚠️ Warning: Failed to generate report for {date_str}")
-        
-        print(f"📊 Generation results: {successful_generations} successful, {failed_generations} failed")
-        
-        # Verify that all missing reports were actually created
-        still_missing = []
-        for date_str in missing_dates:
-            date_obj = datetime.strptime(date_str, "%Y-%m-%d")
-            date_file = format_date_for_filename(date_obj)
-            
-            # Check for both regular and SMBs versions
-            regular_path = get_report_filename(date_str, True)  # DebugSMBs
-            smbs_path = get_report_filename(date_str, False)    # SMBs
-            
-            if not os.path.exists(regular_path) and not os.path.exists(smbs_path):
-                still_missing.append(date_str)
-        
-        # If any reports are still missing after generation, abort to prevent incomplete weekly email
-        if still_missing:
-            print(f"❌ ERROR: {len(still_missing)} required reports are still missing after generation attempt:")
-            for date_str in still_missing:
-                print(f"   - {date_str}")
-            print("❌ Aborting weekly email to prevent sending incomplete report.")
-            print("   Please investigate and fix the report generation issues before retrying.")
-            sys.exit(1)
-        
-        if failed_generations > 0:
-            print(f"⚠️ Note: {failed_generations} reports had generation warnings, but all reports now exist.")
-    else:
-        print("✅ All reports are up to date")
+    return date, latest_batt, None
+
+
+def _split_sections(latest_batt, active_device_ids):
+    """
+    Split one date's report into the four report sections.
     
-    # Now proceed with the weekly email logic
-    if use_emailed_dates_tracking:
-        # OLD MODE: Filter by emailed_dates
-        files = [f for f in os.listdir("latest_batt_reports") if f.startswith("latest_batt_") and f.endswith(".csv")]
-        report_dates = [f.replace("latest_batt_", "").replace(".csv", "") for f in files]
-        # Remove _smbs suffix if present and sort by date
-        report_dates = [date.replace("_smbs", "").replace("_debug", "") for date in report_dates]
-        report_dates = sorted(report_dates, key=lambda x: parse_date_flexible(x))
-        
-        emailed_dates = get_emailed_dates()
-        new_dates = [date for date in report_dates if date not in emailed_dates]
-    else:
-        # NEW MODE: Last 7 days (reuse date_range from above)
-        # Get last 7 days (including today)
-        date_range = []
-        for i in range(7):
-            date = today - timedelta(days=i)
-            date_range.append(date)
-        date_range.reverse()  # Oldest to newest
-        
-        new_dates = []
-        for date in date_range:
-            # Use consistent format (no leading zero) to match daily.py chart naming
-            date_file = format_date_for_filename(date)
-            date_str = date.strftime("%Y-%m-%d")
-            # Check if report exists (prefer SMBs, fallback to DebugSMBs)
-            smbs_path = get_report_filename(date_str, False)  # SMBs database
-            regular_path = get_report_filename(date_str, True)  # DebugSMBs
-            
-            if os.path.exists(smbs_path) or os.path.exists(regular_path):
-                new_dates.append(date_file)
+    Args:
+        latest_batt (pandas.DataFrame): Battery data for one date
+        active_device_ids (pandas.Index, optional): Active device IDs to filter by
         
-        new_dates = sorted(new_dates, key=lambda x: parse_date_flexible(x))
+    Returns:
+        dict: Section name -> filtered DataFrame
+    """
+    from data_processing.data_filters import get_new_pv_panel_devices, get_zim_c_devices, get_samskip_devices, get_hmm_devices
+    
+    return {
+        'new_pv': get_new_pv_panel_devices(latest_batt, active_device_ids),
+        'zim_c': get_zim_c_devices(latest_batt, active_device_ids),
+        'samskip': get_samskip_devices(latest_batt, active_device_ids),
+        'hmm': get_hmm_devices(latest_batt, active_device_ids)
+    }
 
-    print(f"🆕 Dates to email: {new_dates}")
 
-    if not new_dates:
-        print("No reports to send.")
-        sys.exit(0)  # Success - no reports is a valid state
+def _count_power_modes(all_dates_data, section):
+    """
+    Count power modes per date for one section with a single groupby over all dates.
     
-    # Verify all new_dates have corresponding CSV files before proceeding
-    missing_csv_files = []
-    for date in new_dates:
-        date_obj = datetime.strptime(date, "%d%b%y")
-        date_iso = date_obj.strftime("%Y-%m-%d")
-        path_csv = get_report_filename(date_iso, False)  # SMBs database
+    Args:
+        all_dates_data (dict): Date -> section name -> PowerMode Series of the filtered devices
+        section (str): Section name (e.g., 'new_pv')
         
-        if not os.path.exists(path_csv):
-            missing_csv_files.append((date, path_csv))
-    
-    if missing_csv_files:
-        print(f"❌ ERROR: {len(missing_csv_files)} CSV files are missing for dates that should be included:")
-        for date, path in missing_csv_files:
-            print(f"   - {date}: {path}")
-        print("❌ Aborting weekly email to prevent sending incomplete report.")
-        sys.exit(1)
+    Returns:
+        dict: Date -> {'Critical': int, 'Low': int, 'Medium': int}
+    """
+    import pandas as pd
+    
+    # Recode every date onto the same fixed categories (modes outside them become NaN and are not counted),
+    # so the concatenation stays categorical and the groupby works on small integer codes
+    mode_dtype = pd.CategoricalDtype(POWER_MODES)
+    power_modes = {date: date_data[section].astype(mode_dtype) for date, date_data in all_dates_data.items()}
+    counts = (pd.concat(power_modes, names=['__date'])
+              .groupby(level='__date').value_counts()
+              .unstack(fill_value=0))
+    
+    section_counts = {}
+    for date in all_dates_data:
+        row = counts.loc[date] if date in counts.index else {}
+        section_counts[date] = {mode: int(row.get(mode, 0)) for mode in ('Critical', 'Low', 'Medium')}
+    return section_counts
+
+
+def _assemble_and_send(new_dates, recipients, date_meta):
+    """
+    Collect the report data for the given dates, render the weekly email and send it.
     
-    # Determine recipients based on debug mode
-    if debug_mode:
-        # Debug mode: send only to first recipient (rashel)
-        recipients = [EMAIL_CONFIG['recipients'][0]]
-        print(f"🐛 Debug mode: Sending to {recipients[0]} only")
-    else:
-        # Normal mode: send to all recipients from EMAIL_CONFIG
-        recipients = EMAIL_CONFIG['recipients']
-        print(f"📧 Normal mode: Sending to {len(recipients)} recipients")
+    Args:
+        new_dates (list): Report dates to include (e.g., ['5Jan25', '6Jan25']), oldest to newest
+        recipients (list): Email addresses to send the report to
+        date_meta (dict): Date -> {'iso': 'YYYY-MM-DD', 'pretty': '5 January 2025', 'short': '5 Jan'}
+    """
+    from database.queries import get_active_devices, get_power_mode_statistics, get_organization_names, get_total_device_count
+    from data_processing.visualization import plot_power_stats_combined
+    from email.mime.multipart import MIMEMultipart
+    from email.mime.text import MIMEText
+    from email.mime.image import MIMEImage
+    import pandas as pd
     
     email = MIMEMultipart()
     email['From'] = EMAIL_CONFIG['sender']
     email['To'] = ', '.join(recipients)
     email['Subject'] = f"Weekly Battery Report - {len(new_dates)} Reports"
 
-    # Helper function to get power mode counts
-    def get_power_mode_text(counts):
-        critical = counts.get('Critical', 0)
-        low = counts.get('Low', 0)
-        medium = counts.get('Medium', 0)
-        return f"Critical: {critical}, Low: {low}, Medium: {medium}"
-
     # Query active devices (weekly reports use SMBs database)
     # Query all active devices once, then filter in Python (can't include large lists in SQL)
     active_device_ids = None
     try:
         active_devices_df, _ = get_active_devices()
-        # Get set of active device IDs (DeviceID only - filtering done in Python)
-        active_device_ids = set(active_devices_df['DeviceID'].dropna().tolist())
-        print(f"✅ Found {len(active_device_ids)} active devices")
+        # Keep the active device IDs as a pandas Index (DeviceID only - filtering done in Python);
+        # the section filters' isin() uses it directly without boxing every ID into a Python set
+        active_device_ids = pd.Index(active_devices_df['DeviceID'].dropna().unique())
+        log.info(f"✅ Found {len(active_device_ids)} active devices")
     except Exception as e:
-        print(f"⚠️ Warning: Could not query active devices: {e}")
-        print("   Continuing without active device filtering")
+        log.warning(f"⚠️ Warning: Could not query active devices: {e}")
+        log.warning("   Continuing without active device filtering")
         active_device_ids = None
     
-    # Collect data for all dates first
+    # Collect data for all dates first.
+    # Report reads run ahead in worker threads while the main thread filters the dates already read,
+    # so file I/O overlaps with the pandas filtering (which stays on a single thread).
     all_dates_data = {}
+    date_counts = {date: {} for date in new_dates}
     read_errors = []
-    
-    for date in new_dates:
-        # Convert date from flexible format to %Y-%m-%d format for get_report_filename
-        date_obj = parse_date_flexible(date)
-        date_iso = date_obj.strftime("%Y-%m-%d")
-        
-        # Read existing CSV data (no generation needed)
-        path_csv = get_report_filename(date_iso, False)  # SMBs database
-        print(f"📁 Reading CSV for {date}: {path_csv}")
-        
-        if not os.path.exists(path_csv):
-            read_errors.append((date, f"CSV file not found: {path_csv}"))
-            continue
-        
-        try:
-            latest_batt, _ = read_df_with_metadata(path_csv)
-            
-            # Get section data (filtered by active devices if available)
-            new_pv_devices = get_new_pv_panel_devices(latest_batt, active_device_ids)
-            zim_c_devices = get_zim_c_devices(latest_batt, active_device_ids)
-            samskip_devices = get_samskip_devices(latest_batt, active_device_ids)
-            hmm_devices = get_hmm_devices(latest_batt, active_device_ids)
-            
-            # Store data for this date
-            all_dates_data[date] = {
-                'new_pv': new_pv_devices,
-                'zim_c': zim_c_devices,
-                'samskip': samskip_devices,
-                'hmm': hmm_devices
-            }
-        except Exception as e:
-            read_errors.append((date, f"Error reading CSV: {str(e)}"))
-            continue
-    
-    # If any CSV files failed to read, abort to prevent incomplete weekly email
+    active_filtered = active_device_ids is not None
+    active_devices_key = get_active_devices_key(active_device_ids)
+    reference_date = pd.Timestamp.today().strftime('%Y-%m-%d')
+    
+    with ThreadPoolExecutor(max_workers=min(8, len(new_dates))) as executor:
+        futures = [executor.submit(_read_date, date, date_meta[date]['iso'], active_devices_key, reference_date) for date in new_dates]
+        # Handle each report as soon as its read finishes, whatever the date order
+        for future in as_completed(futures):
+            date, latest_batt, error = future.result()
+            if error is not None:
+                read_errors.append((date, error))
+                continue
+            if isinstance(latest_batt, dict):
+                # Counts came from the daily report's sidecar; nothing left to filter
+                date_counts[date] = latest_batt
+                continue
+            try:
+                # Get section data (filtered by active devices if available), keeping only the
+                # PowerMode column so the full report frames can be freed as soon as they are split
+                sections = _split_sections(latest_batt, active_device_ids)
+                all_dates_data[date] = {section: df['PowerMode'] for section, df in sections.items()}
+            except Exception as e:
+                read_errors.append((date, f"Error reading report: {str(e)}"))
+    
+    # If any report files failed to read, abort to prevent incomplete weekly email
     if read_errors:
-        print(f"❌ ERROR: Failed to read {len(read_errors)} CSV files:")
+        log.error(f"❌ ERROR: Failed to read {len(read_errors)} report files:")
         for date, error_msg in read_errors:
-            print(f"   - {date}: {error_msg}")
-        print("❌ Aborting weekly email to prevent sending incomplete report.")
+            log.error(f"   - {date}: {error_msg}")
+        log.error("❌ Aborting weekly email to prevent sending incomplete report.")
         sys.exit(1)
     
+    # Count power modes once per section (for all dates read from reports) so the HTML builder only does dict lookups
+    if all_dates_data:
+        for section in ('new_pv', 'zim_c', 'samskip', 'hmm'):
+            for date, counts in _count_power_modes(all_dates_data, section).items():
+                date_counts[date][section] = counts
+    
     # Use existing charts (no generation needed)
     latest_date = new_dates[-1]  # Use the most recent date for charts
-    chart_paths = {}
-    
-    # Section 1: New PV Panel chart
-    new_pv_chart_path = f"latest_batt_reports/charts/new_pv_panel_{latest_date}.png"
-    if os.path.exists(new_pv_chart_path):
-        chart_paths['new_pv'] = new_pv_chart_path
-        print(f"📊 Using existing New PV Panel chart: {new_pv_chart_path}")
-    else:
-        print(f"⚠️ New PV Panel chart not found: {new_pv_chart_path}")
+    charts_set = _snapshot_dir(CHARTS_DIR)
+    
+    # One pass per section: attach the chart if it exists and build its HTML snippet
+    chart_html = {}
+    for section, label, prefix in SECTIONS:
+        # The daily SMBs run's chart, drawn with the same active device filtering as this run
+        chart_path = get_chart_filename(prefix, latest_date, False, active_filtered)
+        if os.path.basename(chart_path) in charts_set:
+            log.info(f"📊 Using existing {label} chart: {chart_path}")
+            with open(chart_path, 'rb') as f:
+                img_part = MIMEImage(f.read())
+            img_part.add_header('Content-ID', f'<{section}_chart>')
+            email.attach(img_part)
+            chart_html[section] = f'<img src="cid:{section}_chart" style="display:block;"><br>'
+        else:
+            log.warning(f"⚠️ {label} chart not found: {chart_path}")
+            chart_html[section] = ''
     
-    # Section 2: ZIM C Devices chart
-    zim_c_chart_path = f"latest_batt_reports/charts/zim_c_devices_{latest_date}.png"
-    if os.path.exists(zim_c_chart_path):
-        chart_paths['zim_c'] = zim_c_chart_path
-        print(f"📊 Using existing ZIM C chart: {zim_c_chart_path}")
-    else:
-        print(f"⚠️ ZIM C chart not found: {zim_c_chart_path}")
+    log.debug(f"🔍 Chart HTML variables:")
+    for section, html in chart_html.items():
+        log.debug(f"  {section}_chart_html: {repr(html)}")
     
-    # Section 3: Samskip Devices chart
-    samskip_chart_path = f"latest_batt_reports/charts/samskip_devices_{latest_date}.png"
-    if os.path.exists(samskip_chart_path):
-        chart_paths['samskip'] = samskip_chart_path
-        print(f"📊 Using existing Samskip chart: {samskip_chart_path}")
-    else:
-        print(f"⚠️ Samskip chart not found: {samskip_chart_path}")
+    active_note = '<li><strong>Device status = Active</strong> (filtered from AssetsView)</li>' if active_device_ids is not None else ''
     
-    # Section 4: HMM Devices chart
-    hmm_chart_path = f"latest_batt_reports/charts/hmm_devices_{latest_date}.png"
-    if os.path.exists(hmm_chart_path):
-        chart_paths['hmm'] = hmm_chart_path
-        print(f"📊 Using existing HMM chart: {hmm_chart_path}")
-    else:
-        print(f"⚠️ HMM chart not found: {hmm_chart_path}")
-    
-    # Attach images
-    for section, chart_path in chart_paths.items():
-        with open(chart_path, 'rb') as f:
-            img_data = f.read()
-        img_part = MIMEImage(img_data)
-        img_part.add_header('Content-ID', f'<{section}_chart>')
-        email.attach(img_part)
-    
-    # Build HTML content with 4 sections
-    new_pv_chart_html = '<img src="cid:new_pv_chart" style="display:block;"><br>' if 'new_pv' in chart_paths else ''
-    zim_c_chart_html = '<img src="cid:zim_c_chart" style="display:block;"><br>' if 'zim_c' in chart_paths else ''
-    samskip_chart_html = '<img src="cid:samskip_chart" style="display:block;"><br>' if 'samskip' in chart_paths else ''
-    hmm_chart_html = '<img src="cid:hmm_chart" style="display:block;"><br>' if 'hmm' in chart_paths else ''
-    
-    print(f"🔍 Chart HTML variables:")
-    print(f"  new_pv_chart_html: {repr(new_pv_chart_html)}")
-    print(f"  zim_c_chart_html: {repr(zim_c_chart_html)}")
-    print(f"  samskip_chart_html: {repr(samskip_chart_html)}")
-    print(f"  hmm_chart_html: {repr(hmm_chart_html)}")
-    print(f"  chart_paths keys: {list(chart_paths.keys())}")
-    
-    html_content = f"""
+    parts = [f"""
     <html>
         <body>
             <h2>Weekly Battery Report - {len(new_dates)} Reports</h2>
-            <p><strong>Reports included:</strong> {', '.join([parse_date_flexible(d).strftime('%-d %b') for d in new_dates])}</p>
+            <p><strong>Reports included:</strong> {', '.join(date_meta[date]['short'] for date in new_dates)}</p>
             <br>
-            
-            <h3>Section 1: New PV Panel</h3>
-            <p><strong>Devices included in the statistics below:</strong></p>
-            <ul>
-                <li>Devices from Mila's list</li>
-                <li><strong>CustomerName = ZIM</strong> which are
-                    <ul>
-                        <li>paired</strong></li>
-                        <li>DeviceID starting with <strong>'A0'</strong></li>
-                        <li>DeviceID is 6000-series or higher</li>
-                    </ul>
-                </li>
-                <li>Only include reports from the last 12 weeks</li>
-                {'<li><strong>Device status = Active</strong> (filtered from AssetsView)</li>' if active_device_ids is not None else ''}
-            </ul>
-            {new_pv_chart_html}
-            <h4>Power Mode Counts by Date:</h4>
-    """
-    
-    # Add power mode counts for each date for New PV Panel
-    for date in new_dates:
-        formatted_date = parse_date_flexible(date).strftime('%-d %B %Y')
-        new_pv_counts = all_dates_data[date]['new_pv']['PowerMode'].value_counts().to_dict() if len(all_dates_data[date]['new_pv']) > 0 else {}
-        html_content += f"            <p><strong>{formatted_date}:</strong> {get_power_mode_text(new_pv_counts)}</p>\n"
-    
-    html_content += f"""
-            <br><br>
-            
-            <h3>Section 2: ZIM C-Series Devices</h3>
-            <p><strong>Devices included in the statistics below:</strong></p>
-            <ul>
-                <li><strong>CustomerName = ZIM</strong> which are
-                    <ul>
-                        <li>paired</strong></li>
-                        <li>DeviceID starting with <strong>'C'</strong></li>
-                    </ul>
-                </li>
-                <li>Only include reports from the last 12 weeks</li>
-                {'<li><strong>Device status = Active</strong> (filtered from AssetsView)</li>' if active_device_ids is not None else ''}
-            </ul>
-            {zim_c_chart_html}
-            <h4>Power Mode Counts by Date:</h4>
-    """
-    
-    # Add power mode counts for each date for ZIM C Devices
-    for date in new_dates:
-        formatted_date = parse_date_flexible(date).strftime('%-d %B %Y')
-        zim_c_counts = all_dates_data[date]['zim_c']['PowerMode'].value_counts().to_dict() if len(all_dates_data[date]['zim_c']) > 0 else {}
-        html_content += f"            <p><strong>{formatted_date}:</strong> {get_power_mode_text(zim_c_counts)}</p>\n"
-    
-    html_content += f"""
-            <br><br>
-            
-            <h3>Section 3: Samskip Devices</h3>
-            <p><strong>Devices included in the statistics below:</strong></p>
-            <ul>
-                <li><strong>CustomerName = Samskip</strong></li>
-                <li>paired</li>
-                <li>Only include reports from the last 12 weeks</li>
-                {'<li><strong>Device status = Active</strong> (filtered from AssetsView)</li>' if active_device_ids is not None else ''}
-            </ul>
-            {samskip_chart_html}
-            <h4>Power Mode Counts by Date:</h4>
-    """
-    
-    # Add power mode counts for each date for Samskip Devices
-    for date in new_dates:
-        formatted_date = parse_date_flexible(date).strftime('%-d %B %Y')
-        samskip_counts = all_dates_data[date]['samskip']['PowerMode'].value_counts().to_dict() if len(all_dates_data[date]['samskip']) > 0 else {}
-        html_content += f"            <p><strong>{formatted_date}:</strong> {get_power_mode_text(samskip_counts)}</p>\n"
-    
-    html_content += f"""
-            <br><br>
-            
-            <h3>Section 4: HMM Devices</h3>
-            <p><strong>Devices included in the statistics below:</strong></p>
-            <ul>
-                <li><strong>CustomerName = HMM</strong></li>
-                <li>paired</li>
-                <li>Only include reports from the last 12 weeks</li>
-                {'<li><strong>Device status = Active</strong> (filtered from AssetsView)</li>' if active_device_ids is not None else ''}
-            </ul>
-            {hmm_chart_html}
-            <h4>Power Mode Counts by Date:</h4>
-    """
-    
-    # Add power mode counts for each date for HMM Devices
-    for date in new_dates:
-        formatted_date = parse_date_flexible(date).strftime('%-d %B %Y')
-        hmm_counts = all_dates_data[date]['hmm']['PowerMode'].value_counts().to_dict() if len(all_dates_data[date]['hmm']) > 0 else {}
-        html_content += f"            <p><strong>{formatted_date}:</strong> {get_power_mode_text(hmm_counts)}</p>\n"
+            """]
+    
+    # Each section is its static head followed by one power mode counts row per date
+    section_heads = {
+        'new_pv': SECTION1_HEAD,
+        'zim_c': SECTION2_HEAD,
+        'samskip': SECTION3_HEAD,
+        'hmm': SECTION4_HEAD,
+    }
+    for section, _, _ in SECTIONS:
+        parts.append(section_heads[section].format_map({'active_note': active_note, 'chart_html': chart_html[section]}))
+        for date in new_dates:
+            parts.append(ROW_TEMPLATE.format_map({'date': date_meta[date]['pretty'], **date_counts[date][section]}))
     
     # Get fleet-wide power mode statistics (filtered to specific organization IDs)
-    print("📊 Querying fleet-wide power mode statistics...")
+    log.info("📊 Querying fleet-wide power mode statistics...")
     try:
         # Filter to specific organization IDs
         target_org_ids = [18, 54, 90, 31, 89, 69, 91, 51]
         
-        fleet_stats_df, stats_query_time = get_power_mode_statistics(organization_ids=target_org_ids, exclude_asset_group_id=None)
-        print(f"✅ Fleet statistics query completed in {int(stats_query_time)} seconds")
-        
-        # Get organization names and device count
-        org_names_df, org_names_query_time = get_organization_names(target_org_ids)
-        print(f"✅ Organization names query completed in {int(org_names_query_time)} seconds")
-        
-        device_count, device_count_query_time = get_total_device_count(target_org_ids)
-        print(f"✅ Device count query completed in {int(device_count_query_time)} seconds")
+        # The three queries are independent (each opens its own connection), so run them concurrently
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            stats_future = executor.submit(get_power_mode_statistics, organization_ids=target_org_ids, exclude_asset_group_id=None)
+            org_names_future = executor.submit(get_organization_names, target_org_ids)
+            device_count_future = executor.submit(get_total_device_count, target_org_ids)
+            
+            fleet_stats_df, stats_query_time = stats_future.result()
+            log.info(f"✅ Fleet statistics query completed in {int(stats_query_time)} seconds")
+            
+            # Get organization names and device count
+            org_names_df, org_names_query_time = org_names_future.result()
+            log.info(f"✅ Organization names query completed in {int(org_names_query_time)} seconds")
+            
+            device_count, device_count_query_time = device_count_future.result()
+            log.info(f"✅ Device count query completed in {int(device_count_query_time)} seconds")
         
         if len(fleet_stats_df) > 0 and fleet_stats_df['TotalYears'].iloc[0] > 0:
-            # Ensure charts directory exists
-            charts_dir = "latest_batt_reports/charts"
-            os.makedirs(charts_dir, exist_ok=True)
-            
             # Generate combined chart for fleet-wide stats
-            fleet_chart_path = f"{charts_dir}/fleet_power_stats_{latest_date}.png"
+            fleet_chart_path = os.path.join(CHARTS_DIR, f"fleet_power_stats_{latest_date}.png")
             plot_power_stats_combined(fleet_stats_df, list_name="Fleet-Wide (Selected Organizations)", path_save=fleet_chart_path)
-            print(f"📊 Fleet statistics chart saved: {fleet_chart_path}")
+            log.info(f"📊 Fleet statistics chart saved: {fleet_chart_path}")
             
             # Attach fleet chart image
             if os.path.exists(fleet_chart_path):
                 with open(fleet_chart_path, 'rb') as f:
-                    img_data = f.read()
-                img_part = MIMEImage(img_data)
+                    img_part = MIMEImage(f.read())
                 img_part.add_header('Content-ID', '<fleet_stats_chart>')
                 email.attach(img_part)
                 # Display image smaller in email (600px width, maintain aspect ratio)
@@ -554,7 +503,7 @@ def email_weekly_report(use_emailed_dates_tracking=False, debug_mode=False):
             low_pct = fleet_stats_df['LowPercent'].iloc[0]
             critical_pct = fleet_stats_df['CriticalPercent'].iloc[0]
             
-            html_content += f"""
+            parts.append(f"""
             <br><br>
             <hr style="border: 2px solid #333; margin: 30px 0;">
             <br>
@@ -574,60 +523,241 @@ def email_weekly_report(use_emailed_dates_tracking=False, debug_mode=False):
             {fleet_chart_html}
         </body>
     </html>
-    """
+    """)
         else:
-            print("⚠️ No fleet statistics data available (TotalYears = 0)")
-            html_content += """
+            log.warning("⚠️ No fleet statistics data available (TotalYears = 0)")
+            parts.append("""
         </body>
     </html>
-    """
+    """)
     except Exception as e:
-        print(f"⚠️ Warning: Could not generate fleet statistics: {e}")
-        import traceback
-        traceback.print_exc()
-        html_content += """
+        log.warning(f"⚠️ Warning: Could not generate fleet statistics: {e}", exc_info=True)
+        parts.append("""
         </body>
     </html>
-    """
+    """)
     
+    html_content = "".join(parts)
     html_part = MIMEText(html_content, 'html')
     email.attach(html_part)
     
-    with smtplib.SMTP('smtp.gmail.com', 587) as server:
-        server.starttls()
-        server.login(EMAIL_CONFIG['sender'], EMAIL_CONFIG['password'])
-        server.send_message(email)
+    send_messages([email])
+
+def email_weekly_report(use_emailed_dates_tracking=False, debug_mode=False, generate_missing=True):
+    """
+    Send weekly report with reports from the last 7 days.
+    Optionally can use emailed_dates.txt tracking (deprecated).
+    
+    Args:
+        use_emailed_dates_tracking (bool): If True, use old tracking system based on emailed_dates.txt.
+                                          If False (default), send last 7 days from today.
+        debug_mode (bool): If True, send only to rashel. If False, send to all recipients.
+        generate_missing (bool): If True (default), generate any missing daily reports before sending.
+                                 If False, send only the reports that already exist.
+    """
+    log.info("🔄 Starting weekly report process...")
+    
+    # Get current date and the last 7 days (including today), oldest to newest
+    today = datetime.now()
+    date_range = [today - timedelta(days=i) for i in range(6, -1, -1)]
+    all_recipients = EMAIL_CONFIG['recipients']
+    
+    # List the reports directory once; existence checks below are set lookups
+    reports_set = _snapshot_dir(REPORTS_DIR)
+    
+    if use_emailed_dates_tracking:
+        # OLD MODE: Use emailed_dates.txt tracking (deprecated)
+        emailed_dates = get_emailed_dates()
+        log.info(f"📅 Today's date: {format_date_for_filename(today)}")
+        log.info(f"📧 Last emailed dates: {emailed_dates[-5:] if len(emailed_dates) > 5 else emailed_dates}")
+        
+        # Find missing dates that need report generation
+        missing_dates = find_missing_dates(emailed_dates, today, reports_set)
+    else:
+        # NEW MODE: Last 7 days from today
+        log.info(f"📅 Today's date: {format_date_for_filename(today)}")
+        log.info("📊 Using last 7 days mode (emailed_dates.txt tracking disabled)")
+        
+        # Check which dates need report generation
+        missing_dates = []
+        for date in date_range:
+            date_str = date.strftime("%Y-%m-%d")
+            _convert_legacy_for_date(date_str, reports_set)
+            
+            # Check for both regular and SMBs versions
+            if _report_names(date_str).isdisjoint(reports_set):
+                missing_dates.append(date_str)
+                log.info(f"📅 Missing report for {date_str}")
+            else:
+                log.info(f"✅ Report exists for {date_str}")
+    
+    if missing_dates and not generate_missing:
+        log.info(f"⏭️ Skipping generation of {len(missing_dates)} missing reports")
+    elif missing_dates:
+        log.info(f"🔧 Generating {len(missing_dates)} missing reports...")
+        successful_generations = 0
+        failed_generations = 0
+        failed_dates = []
+        
+        # Dates are independent, so generate them in parallel worker processes (processes rather than
+        # threads, since chart drawing goes through matplotlib's global pyplot state). Always spawn the
+        # workers: forking after pyarrow has started its thread pool is unsafe, especially on macOS.
+        mp_context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=min(len(missing_dates), os.cpu_count() or 1), mp_context=mp_context) as executor:
+            results = list(executor.map(generate_missing_report, missing_dates))
+        
+        for date_str, generated, error, output in results:
+            if output:
+                # Show each worker's output as one block, at warning level if its report failed
+                log.log(logging.INFO if generated else logging.WARNING,
+                        f"📄 Output of report generation for {date_str}:\n{output.rstrip()}")
+            if generated:
+                successful_generations += 1
+                log.info(f"✅ Successfully generated report for {date_str}")
+            else:
+                failed_generations += 1
+                failed_dates.append(date_str)
+                if error is not None:
+                    log.error(f"❌ Exception generating report for {date_str}: {error}")
+                else:
+                    log.error(f"❌ Failed to generate report for {date_str}")
+                log.warning(f"⚠️ Warning: Failed to generate report for {date_str}")
+        
+        log.info(f"📊 Generation results: {successful_generations} successful, {failed_generations} failed")
+        
+        # Verify that all missing reports were actually created. Only the regenerated dates can have
+        # changed, so check just their files and update the snapshot instead of re-scanning the directory
+        for date_str in missing_dates:
+            for name in _report_names(date_str):
+                if os.path.isfile(os.path.join(REPORTS_DIR, name)):
+                    reports_set.add(name)
+        still_missing = [date_str for date_str in missing_dates if _report_names(date_str).isdisjoint(reports_set)]
+        
+        # If any reports are still missing after generation, abort to prevent incomplete weekly email
+        if still_missing:
+            log.error(f"❌ ERROR: {len(still_missing)} required reports are still missing after generation attempt:")
+            for date_str in still_missing:
+                log.error(f"   - {date_str}")
+            log.error("❌ Aborting weekly email to prevent sending incomplete report.")
+            log.error("   Please investigate and fix the report generation issues before retrying.")
+            sys.exit(1)
+        
+        if failed_generations > 0:
+            log.warning(f"⚠️ Note: {failed_generations} reports had generation warnings, but all reports now exist.")
+    else:
+        log.info("✅ All reports are up to date")
+    
+    # Now proceed with the weekly email logic
+    if use_emailed_dates_tracking:
+        # OLD MODE: Filter by emailed_dates
+        # Extract the date part of each report filename (dropping any _smbs/_debug suffix)
+        report_dates = set()
+        for name in reports_set:
+            match = REPORT_FILENAME_RE.fullmatch(name)
+            if match:
+                report_dates.add(match.group(1))
+        # Sort by date, parsing all dates in one vectorized call
+        import pandas as pd
+        report_dates = list(report_dates)
+        parsed_dates = pd.to_datetime(report_dates, format="%d%b%y")
+        # Keep each parsed date so nothing below parses it again
+        date_dts = dict(zip(report_dates, parsed_dates))
+        report_dates = [report_dates[i] for i in parsed_dates.argsort()]
+        
+        emailed_set = set(get_emailed_dates())
+        new_dates = [date for date in report_dates if date not in emailed_set]
+    else:
+        # NEW MODE: Last 7 days (reuse date_range from above)
+        new_dates = []
+        date_dts = {}
+        for date in date_range:
+            # Use consistent format (no leading zero) to match daily.py chart naming
+            date_file = format_date_for_filename(date)
+            date_str = date.strftime("%Y-%m-%d")
+            # Check if report exists (SMBs or DebugSMBs)
+            if not _report_names(date_str).isdisjoint(reports_set):
+                new_dates.append(date_file)
+                date_dts[date_file] = date
+        # date_range is already oldest to newest, so new_dates needs no sorting
+
+    log.info(f"🆕 Dates to email: {new_dates}")
+
+    if not new_dates:
+        log.info("No reports to send.")
+        sys.exit(0)  # Success - no reports is a valid state
+    
+    # Format every date once (vectorized); the checks, reads and HTML below only look these up
+    import pandas as pd
+    dts = pd.DatetimeIndex([date_dts[date] for date in new_dates])
+    date_meta = {
+        date: {'iso': iso, 'pretty': pretty, 'short': short}
+        for date, iso, pretty, short in zip(
+            new_dates, dts.strftime('%Y-%m-%d'), dts.strftime('%-d %B %Y'), dts.strftime('%-d %b')
+        )
+    }
+    
+    # Verify all new_dates have corresponding report files before proceeding
+    missing_report_files = []
+    for date in new_dates:
+        path_report = get_report_filename(date_meta[date]['iso'], False)  # SMBs database
+        _convert_legacy_for_date(date_meta[date]['iso'], reports_set)
+        
+        if os.path.basename(path_report) not in reports_set:
+            missing_report_files.append((date, path_report))
+    
+    if missing_report_files:
+        log.error(f"❌ ERROR: {len(missing_report_files)} report files are missing for dates that should be included:")
+        for date, path in missing_report_files:
+            log.error(f"   - {date}: {path}")
+        log.error("❌ Aborting weekly email to prevent sending incomplete report.")
+        sys.exit(1)
+    
+    # Determine recipients based on debug mode
+    if debug_mode:
+        # Debug mode: send only to first recipient (rashel)
+        recipients = [all_recipients[0]]
+        log.info(f"🐛 Debug mode: Sending to {recipients[0]} only")
+    else:
+        # Normal mode: send to all recipients from EMAIL_CONFIG
+        recipients = all_recipients
+        log.info(f"📧 Normal mode: Sending to {len(recipients)} recipients")
+    
+    _assemble_and_send(new_dates, recipients, date_meta)
     
     # Update log of emailed dates (only if more than 1 recipient)
     num_recipients = len(recipients)
     if num_recipients > 1:
         update_emailed_dates(new_dates)
-        print(f"📝 Updated emailed_dates.txt (multiple recipients: {num_recipients})")
+        log.info(f"📝 Updated emailed_dates.txt (multiple recipients: {num_recipients})")
     else:
-        print(f"📝 Skipped emailed_dates.txt update (single recipient: {num_recipients})")
+        log.info(f"📝 Skipped emailed_dates.txt update (single recipient: {num_recipients})")
     
-    print(f"✅ Weekly email sent successfully")
-    print(f"📊 Reports included: {', '.join(new_dates)}")
-    print(f"📈 Total reports: {len(new_dates)}")
+    log.info(f"✅ Weekly email sent successfully")
+    log.info(f"📊 Reports included: {', '.join(new_dates)}")
+    log.info(f"📈 Total reports: {len(new_dates)}")
     sys.exit(0)  # Success
 
 if __name__ == "__main__":
+    # Progress messages go through logging so cron runs can quiet them with e.g. LOGLEVEL=WARNING
+    logging.basicConfig(level=os.environ.get("LOGLEVEL", "INFO").upper(), format="%(message)s")
+    
     try:
+        args = set(sys.argv[1:])
+        
         # Check for --use-tracking flag to use old emailed_dates.txt system
-        use_tracking = "--use-tracking" in sys.argv or "--track" in sys.argv
+        use_tracking = bool(args & {"--use-tracking", "--track"})
         
         # Check for --debug flag to send only to rashel
-        debug_mode = "--debug" in sys.argv or "-d" in sys.argv
+        debug_mode = bool(args & {"--debug", "-d"})
         
         if use_tracking:
-            print("⚠️ Using deprecated emailed_dates.txt tracking mode")
+            log.warning("⚠️ Using deprecated emailed_dates.txt tracking mode")
         
         if debug_mode:
-            print("🐛 Running in debug mode (sending to rashel only)")
+            log.info("🐛 Running in debug mode (sending to rashel only)")
         
+        ensure_dirs()
         email_weekly_report(use_emailed_dates_tracking=use_tracking, debug_mode=debug_mode)
     except Exception as e:
-        print(f"❌ Fatal error in weekly report: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        log.exception(f"❌ Fatal error in weekly report: {str(e)}")
         sys.exit(1)
@@ -3,15 +3,19 @@ Main entry point for battery status reporting.
 This file now serves as a simple interface to the modular components.
 """
 
+import os
 import sys
+import logging
 from reports.create_report_on_date import generate_battery_snapshot_report
+from data_processing.file_operations import ensure_dirs
 
 if __name__ == "__main__":
-    # Parse command line arguments
-    manual_mode = "--manual" in sys.argv
-    use_old_query = "--old" in sys.argv
+    # Parse command line arguments (as a set, so each flag check is a single lookup)
+    args = set(sys.argv[1:])
+    manual_mode = "--manual" in args
+    use_old_query = "--old" in args
     
-    if "--help" in sys.argv or "-h" in sys.argv:
+    if args & {"--help", "-h"}:
         print("Usage: python main.py [options]")
         print("Options:")
         print("  --manual    Prompt for specific date")
@@ -28,5 +32,9 @@ if __name__ == "__main__":
         print("      Use --old flag for DebugSMBs database.")
         sys.exit(0)
     
+    # Messages from the shared modules go through logging (LOGLEVEL=WARNING quiets them)
+    logging.basicConfig(level=os.environ.get("LOGLEVEL", "INFO").upper(), format="%(message)s")
+    
     # Use the query method based on the flag (SMBs by default, DebugSMBs with --old)
+    ensure_dirs()
     generate_battery_snapshot_report(manual_mode, use_old_query)
\ No newline at end of file
@@ -2,14 +2,18 @@
 Daily battery report generation logic.
 """
 
-import pandas as pd
 import os
-from data_processing.parsing import process_debug_smbs_data, process_smbs_data
-from database.queries import get_latest_batt, get_latest_voltage
-from data_processing.file_operations import save_df_with_metadata, read_df_with_metadata, get_report_filename
-from utils import prompt_for_date
+from datetime import datetime
+from data_processing.file_operations import save_df_with_metadata, read_df_with_metadata, get_report_filename, convert_legacy_report
+from utils import prompt_for_date, format_date_for_filename
 
-def generate_battery_snapshot_report(manual_mode=False, use_old_query=False, specific_date=None):
+# The database queries and parsing (pandas, pyodbc) are imported only when a report has to be
+# generated, so `main.py --help` and loading an existing report do not pay for them
+
+# (report date, use_old_query) -> report date string, for reports already generated or loaded in this process
+_REPORT_CACHE = {}
+
+def generate_battery_snapshot_report(manual_mode=False, use_old_query=False, specific_date=None, use_cache=True):
     """
     Generate battery snapshot report for a specific date or latest data.
     
@@ -17,6 +21,8 @@ def generate_battery_snapshot_report(manual_mode=False, use_old_query=False, spe
         manual_mode (bool): If True and no specific_date, prompt user for date
         use_old_query (bool): If True, use original query implementation
         specific_date (str): Date in 'YYYY-MM-DD' format, or None for latest
+        use_cache (bool): If True (default), return straight away for a report already
+                          handled earlier in this process instead of checking the disk again
         
     Returns:
         str: Report date string (e.g., "15 Jan")
@@ -24,21 +30,29 @@ def generate_battery_snapshot_report(manual_mode=False, use_old_query=False, spe
     if manual_mode and specific_date is None:
         specific_date = prompt_for_date()
 
-    # Generate report date string
+    # Generate report date string (same format as the report filename and chart names)
     if specific_date:
-        date_obj = pd.to_datetime(specific_date, format="%Y-%m-%d")
-        report_date = date_obj.strftime('%-d%b%y')
+        date_obj = datetime.strptime(specific_date, "%Y-%m-%d")
     else:
-        report_date = pd.Timestamp.today().strftime('%-d%b%y')
+        date_obj = datetime.now()
+    report_date = format_date_for_filename(date_obj)
+    
+    # Keyed by the resolved date so a "latest" report does not carry over to the next day
+    cache_key = (report_date, use_old_query)
+    if use_cache and cache_key in _REPORT_CACHE:
+        return _REPORT_CACHE[cache_key]
     
     # Define file paths
-    path_csv = get_report_filename(specific_date, use_old_query)
+    path_report = get_report_filename(specific_date, use_old_query)
 
-    # Check if we already have a report for this date
-    if os.path.exists(path_csv):
-        print(f"Loading existing report for {report_date}")
-        latest_batt, _ = read_df_with_metadata(path_csv)
+    # Check if we already have a report for this date (possibly as a legacy CSV)
+    if os.path.exists(path_report) or convert_legacy_report(path_report):
+        # Callers read the report themselves (with the columns they need), so it is not loaded here
+        print(f"Using existing report for {report_date}")
     else:
+        from database.queries import get_latest_batt, get_latest_voltage
+        from data_processing.parsing import process_debug_smbs_data, process_smbs_data
+        
         # Choose query implementation based on flag
         if use_old_query:
             print(f"Generating new report for {report_date} using DebugSMBs database")
@@ -49,24 +63,28 @@ def generate_battery_snapshot_report(manual_mode=False, use_old_query=False, spe
             latest_batt, query_time = get_latest_voltage(specific_date)
             latest_batt = process_smbs_data(latest_batt)
         
-        save_df_with_metadata(latest_batt, query_time, path_csv)
+        save_df_with_metadata(latest_batt, query_time, path_report)
     
     # Note: Charts are now generated by the emailing system (daily.py) which creates
     # separate charts for each section: new_pv_panel, zim_c_devices, and samskip_devices
 
+    _REPORT_CACHE[cache_key] = report_date
     return report_date
 
+# Lets tests and long-running callers forget reports handled earlier in the process
+generate_battery_snapshot_report.cache_clear = _REPORT_CACHE.clear
+
 def test_main():
     """
     Test function to verify database connection and data retrieval.
     """
     from database.queries import get_test_query
     
-    path_csv = "latest_batt_reports/latest_batt_reports/test_report.csv"
+    path_report = "latest_batt_reports/latest_batt_reports/test_report.parquet"
 
-    if os.path.exists(path_csv):
-        test_df, query_time = read_df_with_metadata(path_csv)
+    if os.path.exists(path_report) or convert_legacy_report(path_report):
+        test_df, query_time = read_df_with_metadata(path_report)
         print(query_time, 's')
     else:
         test_df, query_time = get_test_query()
-        save_df_with_metadata(test_df, query_time, path_csv)
+        save_df_with_metadata(test_df, query_time, path_report)
@@ -30,7 +30,7 @@ def test_smbs_query_and_processing():
         
         # Show raw data info
         print(f"\n📋 Raw data sample:")
-        print(latest_batt_raw.sample(5))
+        print(latest_batt_raw.head(5))
         print(f"\n📊 Raw data types:")
         print(latest_batt_raw.dtypes)
         print(f"\n🔍 Raw column names:")
@@ -45,7 +45,7 @@ def test_smbs_query_and_processing():
         
         # Show processed data info
         print(f"\n📋 Processed data sample:")
-        print(latest_batt_processed.sample(5))
+        print(latest_batt_processed.head(5))
         print(f"\n📊 Processed data types:")
         print(latest_batt_processed.dtypes)
         print(f"\n🔍 Processed column names:")
@@ -54,14 +54,16 @@ def test_smbs_query_and_processing():
         # Show PowerMode distribution
         if 'PowerMode' in latest_batt_processed.columns:
             print(f"\n⚡ PowerMode distribution:")
-            print(latest_batt_processed['PowerMode'].value_counts())
+            print(latest_batt_processed['PowerMode'].value_counts().head(10))
             
         # Show voltage range
         if 'Voltage' in latest_batt_processed.columns:
+            # Compute all three statistics in one call
+            voltage_stats = latest_batt_processed['Voltage'].agg(['min', 'max', 'mean'])
             print(f"\n📊 Voltage statistics:")
-            print(f"   Min: {latest_batt_processed['Voltage'].min():.2f}V")
-            print(f"   Max: {latest_batt_processed['Voltage'].max():.2f}V")
-            print(f"   Mean: {latest_batt_processed['Voltage'].mean():.2f}V")
+            print(f"   Min: {voltage_stats['min']:.2f}V")
+            print(f"   Max: {voltage_stats['max']:.2f}V")
+            print(f"   Mean: {voltage_stats['mean']:.2f}V")
             
     except Exception as e:
         print(f"❌ Error: {e}")
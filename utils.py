@@ -1,4 +1,12 @@
-from datetime import datetime
+import re
+from datetime import datetime, date
+from functools import lru_cache
+
+# Report date strings like '5Jan26' or '05Jan26' (day, month abbreviation, two-digit year)
+_DATE_RE = re.compile(r'(\d{1,2})([A-Za-z]{3})(\d{2})')
+
+# Dates typed at the prompt: YYYY-MM-DD
+_ISO_RE = re.compile(r'\d{4}-\d{2}-\d{2}')
 
 def prompt_for_date():
     """Prompts the user to input a date in YYYY-MM-DD format."""
@@ -12,12 +20,14 @@ def prompt_for_date():
         if user_input == "":
             return current_date
             
-        # Validate the format
-        try:
-            input_date = datetime.strptime(user_input, "%Y-%m-%d")
-            return user_input
-        except ValueError:
-            print("Invalid format! Please use YYYY-MM-DD format (e.g., 2025-03-09)")
+        # Validate the format (the regex rejects malformed input before trying to parse it)
+        if _ISO_RE.fullmatch(user_input):
+            try:
+                date.fromisoformat(user_input)
+                return user_input
+            except ValueError:
+                pass
+        print("Invalid format! Please use YYYY-MM-DD format (e.g., 2025-03-09)")
 
 def get_current_date():
     """Returns the current date in YYYY-MM-DD format."""
@@ -34,13 +44,10 @@ def format_date_for_filename(date_obj):
     Returns:
         str: Formatted date string (e.g., '5Jan26')
     """
-    try:
-        # Try Unix/Mac format first (no leading zero)
-        return date_obj.strftime('%-d%b%y')
-    except ValueError:
-        # Fallback for systems that don't support %-d (Windows)
-        return f"{date_obj.day}{date_obj.strftime('%b%y')}"
+    # Build the unpadded day directly rather than via '%-d', which is not portable (Windows)
+    return f"{date_obj.day}{date_obj.strftime('%b%y')}"
 
+@lru_cache(maxsize=4096)
 def parse_date_flexible(date_str):
     """
     Parse date string that may have or not have leading zero on day.
@@ -52,24 +59,12 @@ def parse_date_flexible(date_str):
     Returns:
         datetime: Parsed datetime object
     """
-    # Try with leading zero first (more common in emailed_dates.txt)
-    try:
-        return datetime.strptime(date_str, "%d%b%y")
-    except ValueError:
-        # Try without leading zero
-        try:
-            return datetime.strptime(date_str, "%-d%b%y")
-        except ValueError:
-            # Last resort: try parsing with single digit day
-            # This handles cases like '5Jan26' on systems that don't support %-d
-            import re
-            match = re.match(r'(\d{1,2})([A-Za-z]{3})(\d{2})', date_str)
-            if match:
-                day, month, year = match.groups()
-                # Reconstruct with leading zero for parsing
-                date_str_normalized = f"{int(day):02d}{month}{year}"
-                return datetime.strptime(date_str_normalized, "%d%b%y")
-            raise ValueError(f"Could not parse date: {date_str}")
+    # Normalize the day to two digits so a single strptime format covers both forms
+    match = _DATE_RE.match(date_str)
+    if match:
+        day, month, year = match.groups()
+        return datetime.strptime(f"{int(day):02d}{month}{year}", "%d%b%y")
+    raise ValueError(f"Could not parse date: {date_str}")
 
 def format_date_for_display(date_input):
     """
@@ -89,9 +84,5 @@ def format_date_for_display(date_input):
         # Otherwise, parse the date string (handles both '5Jan26' and '05Jan26' formats)
         date_obj = parse_date_flexible(date_input)
     
-    # Format for display: '%-d %b %Y' (e.g., '5 Jan 2026')
-    try:
-        return date_obj.strftime('%-d %b %Y')
-    except ValueError:
-        # Fallback for systems that don't support %-d (Windows)
-        return f"{date_obj.day} {date_obj.strftime('%b %Y')}"
\ No newline at end of file
+    # Format for display: '%-d %b %Y' (e.g., '5 Jan 2026'), building the unpadded day directly
+    return f"{date_obj.day} {date_obj.strftime('%b %Y')}"
\ No newline at end of file